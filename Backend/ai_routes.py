@@ -1,115 +1,206 @@
 """
 AI Integration Routes for CAPcoach
+
+All /api/ai/* routes live in `ai_bp`, registered by api.create_app(). The
+Groq-backed services they use are built once per process by `ai_services`
+(see AIServices), under a lock, so concurrent first requests can't construct
+duplicate clients.
 """
 
 import sys
 from pathlib import Path
 from flask import Blueprint, request, jsonify
 import asyncio
-import uuid
+import logging
 import os
+import threading
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-# Initialize as None - lazy load
-conversation_service = None
-emotion_service = None
-AI_ENABLED = False
-AI_ERROR = None
+from ai.utils import tracing
+import http_cache
+
+logger = logging.getLogger(__name__)
+
 
-def initialize_ai_services():
-    global conversation_service, emotion_service, AI_ENABLED, AI_ERROR
-    
-    if conversation_service is not None:
-        return
-    
-    try:
+class AIServices:
+    """
+    The conversation, emotion and insights services, shared by every request.
+
+    `ensure()` builds them the first time it is called (double-checked under a
+    lock) and is a single attribute check afterwards. If the services can't be
+    built (no GROQ_API_KEY, missing modules), `enabled` stays False and `error`
+    says why; initialization is not retried.
+    """
+
+    def __init__(self):
+        self.conversation = None
+        self.emotion = None
+        self.insights = None
+        # Emotion calls go through the micro-batcher when EMOTION_BATCHING is on
+        self.emotion_analyzer = None
+        self.enabled = False
+        self.error = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def ensure(self) -> "AIServices":
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._initialize()
+                    self._initialized = True
+        return self
+
+    def _initialize(self):
         if not os.getenv('GROQ_API_KEY'):
-            AI_ERROR = "GROQ_API_KEY not set"
-            print(f"⚠️ AI services disabled: {AI_ERROR}")
+            self.error = "GROQ_API_KEY not set"
+            logger.warning("AI services disabled", extra={"reason": self.error})
             return
-        
-        from ai.services.groq_conversation_service import GroqConversationalDiagnosisService
-        from ai.services.groq_emotional_service import GroqEmotionalIntelligenceService
-        
-        conversation_service = GroqConversationalDiagnosisService()
-        emotion_service = GroqEmotionalIntelligenceService()
-        AI_ENABLED = True
-        print("✅ AI services loaded")
-        
-    except Exception as e:
-        AI_ERROR = f"Failed to initialize: {e}"
-        print(f"⚠️ AI services disabled: {AI_ERROR}")
+
+        try:
+            from ai.config import config
+            from ai.services.groq_conversation_service import GroqConversationalDiagnosisService
+            from ai.services.groq_emotional_service import GroqEmotionalIntelligenceService
+            from ai.services.insights_service import SessionInsightsService
+
+            conversation = GroqConversationalDiagnosisService()
+            emotion = GroqEmotionalIntelligenceService()
+            insights = SessionInsightsService(conversation.state_manager)
+
+            # Concurrent emotion requests share Groq completions when batching is on
+            if config.emotion_batching:
+                from ai.services.emotion_batcher import EmotionBatcher
+                emotion_analyzer = EmotionBatcher(emotion)
+            else:
+                emotion_analyzer = emotion
+        except ImportError as e:
+            self.error = f"AI modules not found: {e}"
+            logger.warning("AI services disabled", extra={"reason": self.error})
+            return
+        except Exception as e:
+            self.error = f"Failed to initialize: {e}"
+            logger.exception("AI services disabled", extra={"reason": self.error})
+            return
+
+        self.conversation, self.emotion, self.insights = conversation, emotion, insights
+        self.emotion_analyzer = emotion_analyzer
+        self.enabled = True
+        logger.info("AI services loaded", extra={"emotion_batching": config.emotion_batching})
+
+    def unavailable(self):
+        """The 503 returned by routes while the services are disabled."""
+        return jsonify({"error": self.error or "AI services not available"}), 503
+
+
+ai_services = AIServices()
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 
 @ai_bp.route('/health', methods=['GET'])
 def ai_health():
-    initialize_ai_services()
+    services = ai_services.ensure()
     return jsonify({
-        "ai_services": "enabled" if AI_ENABLED else "disabled",
-        "status": "healthy" if AI_ENABLED else "unavailable",
-        "error": AI_ERROR
+        "ai_services": "enabled" if services.enabled else "disabled",
+        "status": "healthy" if services.enabled else "unavailable",
+        "error": services.error,
+        "emotion_parse_failure_rate": services.emotion.parse_failure_rate if services.enabled else None
     })
 
+@ai_bp.route('/rate-limits', methods=['GET'])
+def ai_rate_limits():
+    """Queue depth and wait times of the shared Groq request scheduler, per model."""
+    from ai.services.rate_limiter import shared_scheduler
+    return jsonify(shared_scheduler().snapshot())
+
 @ai_bp.route('/session/start', methods=['POST'])
 def start_ai_session():
-    initialize_ai_services()
-    if not AI_ENABLED:
-        return jsonify({"error": AI_ERROR or "AI unavailable"}), 503
-    
+    services = ai_services.ensure()
+    if not services.enabled:
+        return services.unavailable()
+
     try:
         user_profile = request.json or {}
-        session_data = conversation_service.initiate_diagnostic_conversation(user_profile)
+        session_data = services.conversation.initiate_diagnostic_conversation(user_profile)
         return jsonify(session_data)
     except Exception as e:
-        return jsonify({"error": f"Session failed: {str(e)}"}), 500
+        return jsonify({"error": f"Session start failed: {str(e)}"}), 500
 
 @ai_bp.route('/chat/send', methods=['POST'])
 def send_ai_message():
-    initialize_ai_services()
-    if not AI_ENABLED:
-        return jsonify({"error": AI_ERROR or "AI unavailable"}), 503
-    
+    services = ai_services.ensure()
+    if not services.enabled:
+        return services.unavailable()
+
     try:
         data = request.json
-        response = asyncio.run(conversation_service.process_user_response(
-            data.get('session_id'), 
+        session_id = data.get('session_id')
+        tracing.set_session(session_id)
+        response = asyncio.run(services.conversation.process_user_response(
+            session_id,
             data.get('message')
         ))
         return jsonify(response)
     except Exception as e:
-        return jsonify({"error": f"Message failed: {str(e)}"}), 500
+        return jsonify({"error": f"Message processing failed: {str(e)}"}), 500
 
 @ai_bp.route('/analyze-emotions', methods=['POST'])
 def analyze_emotions():
-    initialize_ai_services()
-    if not AI_ENABLED:
-        return jsonify({"error": AI_ERROR or "AI unavailable"}), 503
-    
+    services = ai_services.ensure()
+    if not services.enabled:
+        return services.unavailable()
+
     try:
         text = request.json.get('text', '')
-        emotions = emotion_service.analyze_emotional_content(text)
+        emotions = services.emotion_analyzer.analyze_emotional_content(text)
+        # Groq scores cover the whole vocabulary, so an all-zero reply must not name its first key
+        dominant, score = max(emotions.items(), key=lambda x: x[1], default=("neutral", 0.0))
         return jsonify({
             "text": text,
             "emotional_analysis": emotions,
-            "dominant_emotion": max(emotions.items(), key=lambda x: x[1])[0] if emotions else "neutral"
+            "dominant_emotion": dominant if score > 0 else "neutral"
         })
     except Exception as e:
-        return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
+        return jsonify({"error": f"Emotion analysis failed: {str(e)}"}), 500
+
+def session_version() -> str:
+    """Insights ETag version: the insights cache key, so it changes whenever the payload can."""
+    services = ai_services.ensure()
+    context = services.insights.state_manager.sessions.get(request.view_args['session_id']) if services.enabled else None
+    if context is None:
+        return ""
+    return "|".join(str(part) for part in services.insights.cache_key(context))
 
 @ai_bp.route('/session/<session_id>/insights', methods=['GET'])
+@http_cache.cached(max_age=0, version=session_version)
 def get_ai_insights(session_id):
-    initialize_ai_services()
-    if not AI_ENABLED:
-        return jsonify({"error": AI_ERROR or "AI unavailable"}), 503
-    
-    return jsonify({
-        "session_id": session_id,
-        "emotional_patterns": {"dominant_emotion": "anxious", "confidence": 0.8},
-        "financial_behavior": {"pattern": "avoidance", "suggested_strategies": ["Start small", "Automate savings"]},
-        "personalized_advice": "Focus on consistent small habits"
-    })
+    services = ai_services.ensure()
+    if not services.enabled:
+        return services.unavailable()
 
+    # Memoized per insights cache key; unchanged polls get a 304 before this runs
+    insights = services.insights.get_insights(session_id)
+    if insights is None:
+        return jsonify({"error": f"Session {session_id} not found"}), 404
+    return jsonify(insights)
+
+# Lightweight video generation stub
+@ai_bp.route('/generate-video/<session_id>', methods=['POST'])
+def generate_video_summary(session_id):
+    """
+    Stub endpoint that pretends to generate a video and returns a text path.
+    This keeps the UI video button functional without heavy dependencies.
+    """
+    try:
+        video_path = f"videos/capcoach_{session_id}.txt"
+        return jsonify({
+            "success": True,
+            "video_path": video_path,
+            "message": "Personalized financial guide created!",
+            "pattern": "balanced",
+            "session_id": session_id
+        })
+    except Exception as e:
+        return jsonify({"error": f"Video generation failed: {str(e)}"}), 500
@@ -1,11 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import sys
 from pathlib import Path
-import os
-import asyncio
+import logging
+import time
 from dotenv import load_dotenv
 
+import http_cache
+import json_provider
+
 # Load environment variables from .env file
 load_dotenv(Path(__file__).parent.parent / 'ai' / '.env')
 
@@ -13,108 +16,86 @@ load_dotenv(Path(__file__).parent.parent / 'ai' / '.env')
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-app = Flask(__name__)
-CORS(app)
+# JSON log lines written by a background listener thread (see ai/utils/logging_config.py)
+from ai.utils.logging_config import configure_logging
+configure_logging()
+logger = logging.getLogger(__name__)
 
-# Initialize AI services as None first
-conversation_service = None
-emotion_service = None
-AI_ENABLED = False
+# Request spans, sampled; exported per CAPCOACH_TRACE_EXPORTER (see ai/utils/tracing.py)
+from ai.utils import tracing
+tracing.configure_tracing()
 
-# Debug: Check if API key is loaded
-print(f"🔑 GROQ_API_KEY loaded: {'Yes' if os.getenv('GROQ_API_KEY') else 'No'}")
+import profiling
+from ai.utils import metrics
+from ai_routes import ai_bp, ai_services
 
-def initialize_ai_services():
-    global conversation_service, emotion_service, AI_ENABLED
-    
-    if conversation_service is not None:
-        return
-    
-    try:
-        # Check for API key
-        if not os.getenv('GROQ_API_KEY'):
-            print("⚠️ GROQ_API_KEY not set - AI services disabled")
-            return
-        
-        from ai.services.groq_conversation_service import GroqConversationalDiagnosisService
-        from ai.services.groq_emotional_service import GroqEmotionalIntelligenceService
-        
-        conversation_service = GroqConversationalDiagnosisService()
-        emotion_service = GroqEmotionalIntelligenceService()
-        AI_ENABLED = True
-        print("✅ Real AI services loaded successfully!")
-        
-    except ImportError as e:
-        print(f"⚠️ AI modules not found: {e}")
-    except Exception as e:
-        print(f"⚠️ Failed to initialize AI services: {e}")
+# The dashboard shows the "irresponsible" demo profile unless a user_id is given
+DEFAULT_USER_ID = "MOCK_U001_IRRESPONSIBLE"
 
-# Initialize on import
-initialize_ai_services()
+# App-level and financial routes; the /api/ai/* routes are in ai_routes.ai_bp
+api_bp = Blueprint('api', __name__)
 
-# Your existing routes here...
-@app.route('/')
-def home():
-    return jsonify({"message": "CAPcoach API", "status": "running", "ai_enabled": AI_ENABLED})
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.trace = tracing.start_trace(
+        f"{request.method} {route}",
+        request_id=request.headers.get('X-Request-ID'),
+        traceparent=request.headers.get('traceparent'),
+        **{"http.method": request.method, "http.route": route}
+    )
+    g.trace.__enter__()
 
-@app.route('/api/health')
-def health():
-    return jsonify({"status": "healthy", "ai_services": "enabled" if AI_ENABLED else "disabled"})
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=str(response.status_code)
+        )
+        # One line per request is a lot at load; DEBUG records are sampled
+        logger.debug("request", extra={
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+        })
+    trace = g.get('trace')
+    if trace is not None:
+        trace.span.set_attribute("http.status_code", response.status_code)
+        response.headers['X-Request-ID'] = trace.request_id
+        traceparent = trace.traceparent_header()
+        if traceparent:
+            response.headers['traceparent'] = traceparent
+    return response
 
-# AI Routes using REAL services
-@app.route('/api/ai/health', methods=['GET'])
-def ai_health():
-    return jsonify({
-        "ai_services": "enabled" if AI_ENABLED else "disabled",
-        "status": "healthy" if AI_ENABLED else "unavailable"
-    })
+def end_request_trace(error=None):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        trace.__exit__(type(error) if error else None, error, None)
 
-@app.route('/api/ai/session/start', methods=['POST'])
-def ai_session_start():
-    if not AI_ENABLED:
-        return jsonify({"error": "AI services not available. Check GROQ_API_KEY."}), 503
-    
-    try:
-        user_profile = request.json or {}
-        session_data = conversation_service.initiate_diagnostic_conversation(user_profile)
-        return jsonify(session_data)
-    except Exception as e:
-        return jsonify({"error": f"Session start failed: {str(e)}"}), 500
+def request_user_id():
+    return request.args.get('user_id', DEFAULT_USER_ID)
 
-@app.route('/api/ai/chat/send', methods=['POST'])
-def ai_chat_send():
-    if not AI_ENABLED:
-        return jsonify({"error": "AI services not available"}), 503
-    
-    try:
-        data = request.json
-        session_id = data.get('session_id')
-        message = data.get('message')
-        
-        response = asyncio.run(conversation_service.process_user_response(session_id, message))
-        return jsonify(response)
-    except Exception as e:
-        return jsonify({"error": f"Message processing failed: {str(e)}"}), 500
+# Your existing routes here...
+@api_bp.route('/')
+def home():
+    return jsonify({"message": "CAPcoach API", "status": "running", "ai_enabled": ai_services.enabled})
 
-@app.route('/api/ai/analyze-emotions', methods=['POST'])
-def analyze_emotions():
-    if not AI_ENABLED:
-        return jsonify({"error": "AI services not available"}), 503
-    
-    try:
-        data = request.json
-        text = data.get('text', '')
-        emotions = emotion_service.analyze_emotional_content(text)
-        return jsonify({
-            "text": text,
-            "emotional_analysis": emotions,
-            "dominant_emotion": max(emotions.items(), key=lambda x: x[1])[0] if emotions else "neutral"
-        })
-    except Exception as e:
-        return jsonify({"error": f"Emotion analysis failed: {str(e)}"}), 500
+@api_bp.route('/api/health')
+def health():
+    return jsonify({"status": "healthy", "ai_services": "enabled" if ai_services.enabled else "disabled"})
+
+@api_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint: request, LLM, analyzer, state, forecast and video metrics."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 # Add your financial routes here (they should work regardless of AI status)
-@app.route('/api/financial/risk-score', methods=['GET'])
+@api_bp.route('/api/financial/risk-score', methods=['GET'])
+@http_cache.cached(max_age=3600, user_id=request_user_id)
 def risk_score():
     return jsonify({
         "risk_score": 45,
@@ -122,7 +103,7 @@ def risk_score():
         "message": "Risk score calculated successfully"
     })
 
-@app.route('/api/financial/predict', methods=['POST'])
+@api_bp.route('/api/financial/predict', methods=['POST'])
 def predict():
     data = request.get_json() or {}
     additional_savings = data.get('additional_monthly_savings', 0)
@@ -135,30 +116,106 @@ def predict():
         "additional_savings": additional_savings,
         "message": "Prediction generated successfully"
     })
-@app.route('/api/test', methods=['GET'])
+
+@api_bp.route('/api/financial/transactions', methods=['GET'])
+@http_cache.cached(max_age=300, user_id=request_user_id)
+def transactions():
+    """
+    Keyset-paginated transactions for one user, newest first.
+
+    Query params: user_id, limit (1-200), cursor (next_cursor from the previous page),
+    start/end (YYYY-MM-DD, inclusive), category, min_amount/max_amount (absolute $),
+    q (description search), order (desc|asc).
+    """
+    from statement_store import default_store
+
+    args = request.args
+    user_id = request_user_id()
+    try:
+        limit = min(max(int(args.get('limit', 50)), 1), 200)
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        min_amount = float(args['min_amount']) if args.get('min_amount') else None
+        max_amount = float(args['max_amount']) if args.get('max_amount') else None
+        page = default_store().page(
+            user_id,
+            limit=limit,
+            cursor=cursor,
+            start=args.get('start') or None,
+            end=args.get('end') or None,
+            category=args.get('category') or None,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            search=args.get('q') or None,
+            descending=args.get('order', 'desc') != 'asc'
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+
+    return jsonify({"user_id": user_id, "limit": limit, **page})
+
+@api_bp.route('/api/financial/savings-target', methods=['POST'])
+def savings_target():
+    """
+    Savings needed to reach one or more net-worth growth targets.
+
+    Body: {"user_id", "target_growth_percent": number or list, "baseline_predicted" (optional,
+    defaults to the user's fitted 12-month forecast)}.
+    """
+    from savings_target import savings_plan
+
+    data = request.get_json() or {}
+    user_id = data.get('user_id', DEFAULT_USER_ID)
+    targets = data.get('target_growth_percent')
+    if targets is None:
+        return jsonify({"error": "target_growth_percent is required"}), 400
+
+    try:
+        plan = savings_plan(user_id, targets, data.get('baseline_predicted'))
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid target: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Savings target failed: {str(e)}"}), 500
+
+    return jsonify(plan)
+
+@api_bp.route('/api/test', methods=['GET'])
 def test():
     return jsonify({"message": "Test endpoint is working!", "status": "success"})
 
-# Lightweight video generation stub
-@app.route('/api/ai/generate-video/<session_id>', methods=['POST'])
-def generate_video_summary(session_id):
+def create_app(init_ai: bool = True) -> Flask:
     """
-    Stub endpoint that pretends to generate a video and returns a text path.
-    This keeps the UI video button functional without heavy dependencies.
+    Build the Flask app: request hooks, the financial routes and the AI routes.
+    With `init_ai`, the AI services are built now rather than on the first AI
+    request (either way only once per process; see ai_routes.AIServices).
     """
-    try:
-        video_path = f"videos/capcoach_{session_id}.txt"
-        return jsonify({
-            "success": True,
-            "video_path": video_path,
-            "message": "Personalized financial guide created!",
-            "pattern": "balanced",
-            "session_id": session_id
-        })
-    except Exception as e:
-        return jsonify({"error": f"Video generation failed: {str(e)}"}), 500
+    app = Flask(__name__)
+    CORS(app)
+
+    # ETags, 304s and gzip/brotli for the dashboard data endpoints
+    http_cache.init_app(app)
+
+    # orjson-backed jsonify when CAPCOACH_JSON=orjson
+    json_provider.init_app(app)
+
+    # cProfile / stack-sample profiles of selected requests (X-Profile header or CAPCOACH_PROFILE_SAMPLE)
+    profiling.init_app(app)
+
+    # Per-route latency histograms and request spans
+    app.before_request(start_request_timer)
+    app.after_request(record_request_latency)
+    app.teardown_request(end_request_trace)
+
+    app.register_blueprint(api_bp)
+    app.register_blueprint(ai_bp)
+
+    if init_ai:
+        ai_services.ensure()
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
-    print("🚀 CAPcoach Backend with REAL AI Services")
-    print("📍 AI Status:", "ENABLED" if AI_ENABLED else "DISABLED")
+    logger.info("Starting CAPcoach backend", extra={"port": 5001, "ai_enabled": ai_services.enabled})
     app.run(port=5001, debug=True)
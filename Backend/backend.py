@@ -1,30 +1,70 @@
-import pandas as pd
+import contextlib
+import math
 import numpy as np
-import json
-from sklearn.preprocessing import StandardScaler
-from pmdarima import auto_arima
-import matplotlib.pyplot as plt
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+from functools import lru_cache
+from pathlib import Path
+
+from stream_json import iter_months
+
+# pandas, scikit-learn and pmdarima take seconds to import between them, so they are
+# imported inside the functions that use them rather than at module load.
+
+DATA_DIR = Path(__file__).parent
+DEFAULT_HISTORY_FILE = DATA_DIR / "alex2Ystable.json"
 
 ############################################   Risk Calculation  #######################################################
 
-def calc_risk(df):
-    # N > 1.0, indicates cash loss
-    avg_burn = (df['expenses'] / df['income']).mean()
+# calc_risk and RiskState share the helpers below. Dollar columns are summed as
+# integer cents and ratio means with an exactly rounded float sum, so a RiskState
+# grown one month at a time gives bit-for-bit the same inputs as the batch version.
 
-    #Debt to Income Ratio, % allocated to debt
-    avg_dti = (df['debt_repay'] / df['income']).mean()
+def _cents(values):
+    return np.rint(np.asarray(values, dtype=float) * 100).astype(np.int64)
 
-    #How long the user could(in theory) survive with no income
-    df['cash_liquid'] = df['checking'] + df['savings'] + df['investment']
-    current_liquid = df['cash_liquid'].iloc[-1]
-    avg_expenses = df['expenses'].mean()
-    runaway_months = current_liquid / avg_expenses
+class _ExactSum:
+    # Running float sum rounded like math.fsum over the same terms (Shewchuk partials)
+    def __init__(self):
+        self.partials = []
+        self.special = 0.0  # inf/nan terms, which fsum can't carry
 
-    # Overall, are they gaining or losing?
-    liquidity_trend = np.polyfit(df.index, pd.to_numeric(df['cash_liquid']), 1)[0]
-    debt_trend = np.polyfit(df.index, pd.to_numeric(df['debt']), 1)[0]
+    def add(self, x):
+        if not math.isfinite(x):
+            self.special += x
+            return
+        partials = []
+        for y in self.partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials.append(lo)
+            x = hi
+        partials.append(x)
+        self.partials = partials
+
+    @property
+    def value(self):
+        return self.special if self.special else math.fsum(self.partials)
+
+def _exact_sum(values):
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    special = float(values[~finite].sum()) if not finite.all() else 0.0
+    return special if special else math.fsum(values[finite])
+
+def _trend(n, sum_x, sum_xx, sum_y, sum_xy):
+    # Least-squares slope (same as np.polyfit(x, y, 1)[0]) from integer sums; y in cents
+    denominator = n * sum_xx - sum_x * sum_x
+    if denominator == 0:
+        return 0.0
+    return (n * sum_xy - sum_x * sum_y) / denominator / 100
 
+def _runaway(current_liquid, n, total_expenses):
+    # current liquid / average expenses, from integer cents
+    return current_liquid * n / total_expenses if total_expenses else math.inf
+
+def risk_score_from(avg_burn, avg_dti, runaway_months, liquidity_trend, debt_trend):
     #Risk score is an arbitrary value 0-100 to measure a given users general financial health
     risk_score = 0
 
@@ -46,78 +86,220 @@ def calc_risk(df):
 
     return max(0, min(100, risk_score))
 
+def calc_risk(df):
+    n = len(df)
+    x = np.arange(n, dtype=np.int64)
+
+    # N > 1.0, indicates cash loss
+    avg_burn = _exact_sum(df['expenses'] / df['income']) / n
+
+    #Debt to Income Ratio, % allocated to debt
+    avg_dti = _exact_sum(df['debt_repay'] / df['income']) / n
+
+    #How long the user could(in theory) survive with no income
+    df['cash_liquid'] = df['checking'] + df['savings'] + df['investment']
+    liquid = _cents(df['checking']) + _cents(df['savings']) + _cents(df['investment'])
+    runaway_months = _runaway(int(liquid[-1]), n, int(_cents(df['expenses']).sum()))
+
+    # Overall, are they gaining or losing?
+    sum_x, sum_xx = int(x.sum()), int((x * x).sum())
+    debt = _cents(df['debt'])
+    liquidity_trend = _trend(n, sum_x, sum_xx, int(liquid.sum()), int((x * liquid).sum()))
+    debt_trend = _trend(n, sum_x, sum_xx, int(debt.sum()), int((x * debt).sum()))
+
+    return risk_score_from(avg_burn, avg_dti, runaway_months, liquidity_trend, debt_trend)
+
+class RiskState:
+    """
+    Running sums behind calc_risk, so a monthly close can append one month per user
+    in O(1) instead of refitting the whole history. update() returns the same
+    score calc_risk would give for the full history.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.sum_x = 0              # Σx, x = month index
+        self.sum_xx = 0             # Σx²
+        self.burn = _ExactSum()     # Σ expenses / income
+        self.dti = _ExactSum()      # Σ debt_repay / income
+        self.expenses = 0           # Σ expenses (cents)
+        self.liquid = 0             # Σ liquid assets (cents)
+        self.x_liquid = 0           # Σ x * liquid
+        self.debt = 0               # Σ debt (cents)
+        self.x_debt = 0             # Σ x * debt
+        self.current_liquid = 0
+
+    @classmethod
+    def from_df(cls, df):
+        state = cls()
+        for row in df[['income', 'expenses', 'debt_repay', 'checking', 'savings', 'investment', 'debt']].itertuples(index=False):
+            state.add(*row)
+        return state
+
+    def add(self, income, expenses, debt_repay, checking, savings, investment, debt):
+        x = self.n
+        liquid = int(_cents(checking)) + int(_cents(savings)) + int(_cents(investment))
+        debt = int(_cents(debt))
+
+        self.n += 1
+        self.sum_x += x
+        self.sum_xx += x * x
+        self.burn.add(float(np.float64(expenses) / np.float64(income)))
+        self.dti.add(float(np.float64(debt_repay) / np.float64(income)))
+        self.expenses += int(_cents(expenses))
+        self.liquid += liquid
+        self.x_liquid += x * liquid
+        self.debt += debt
+        self.x_debt += x * debt
+        self.current_liquid = liquid
+
+    def update(self, month):
+        """Append one monthly_financial_history entry and return the new risk score."""
+        income, expenses, investment, debt, debt_repay, checking, savings = month_row(month)[:7]
+        self.add(income, expenses, debt_repay, checking, savings, investment, debt)
+        return self.score()
+
+    def score(self):
+        return risk_score_from(
+            self.burn.value / self.n,
+            self.dti.value / self.n,
+            _runaway(self.current_liquid, self.n, self.expenses),
+            _trend(self.n, self.sum_x, self.sum_xx, self.liquid, self.x_liquid),
+            _trend(self.n, self.sum_x, self.sum_xx, self.debt, self.x_debt),
+        )
+
 ############################################   Model Building  #########################################################
 
-def user_df_gen():
-    with open("alex2Ystable.json", 'r') as fp:
-        data = json.load(fp)
-    month_data = data['monthly_financial_history']
-
-    # Sort 12 month data into a Pandas DataFrame
-    user_data_year = pd.DataFrame(
-        columns=['month', 'income', 'expenses', 'investment', 'debt', 'debt_repay', 'checking',
-                 'savings', 'risk_score', 'fixed', 'variable', 'overall_expense'])
-    user_data_year['month'] = range(24)
-    user_data_year = user_data_year.set_index('month')
-    for i in range(24):
-        month = month_data[i]
-        month_income = month.get('cash_flow').get('income').get('total')
-        month_expense = month.get('cash_flow').get('expenses').get('total_outflow')
-        month_debt = month.get('balance_sheet_snapshot').get('debts').get('total_debt')
-        month_debt_repay = month.get('cash_flow').get('expenses').get('debt_payments')
-        month_investment_total = month.get('balance_sheet_snapshot').get('investments').get('total_investments')
-
-        # Map each value to its respective column
-        user_data_year.iat[i, 0] = month_income
-        user_data_year.iat[i, 1] = month_expense
-        user_data_year.iat[i, 2] = month_investment_total
-        user_data_year.iat[i, 3] = month_debt
-        user_data_year.iat[i, 4] = month_debt_repay
-        user_data_year.iat[i, 5] = month.get('balance_sheet_snapshot').get('liquid_assets').get('checking_account')
-        user_data_year.iat[i, 6] = month.get('balance_sheet_snapshot').get('liquid_assets').get('savings_account')
-        user_data_year.iat[i, 8] = month.get('cash_flow').get('expenses').get('fixed')
-        user_data_year.iat[i, 9] = month.get('cash_flow').get('expenses').get('variable')
-        user_data_year.iat[i, 10] = month_expense + month.get('cash_flow').get('expenses').get('variable')
-
-    user_data_year['risk_score'] = calc_risk(user_data_year)
-
-    return user_data_year
-
-df = user_df_gen()
-print(df)
-
-df.set_index(pd.date_range(start="2023-01-01", periods=len(df), freq='ME'), inplace=True)
-ts = df['cash_liquid'] - df['debt']
-#ts_scaled = ts
-scaler = StandardScaler()
-ts_scaled = scaler.fit_transform(ts.values.reshape(-1, 1)).flatten()
-
-predictor = auto_arima(
-    ts_scaled,
-    seasonal=True,
-    m=12,
-    D=1,
-    trace=False,
-    error_action='ignore',
-    suppress_warnings=True
-)
-
-next_year = predictor.predict(n_periods=12)
-next_year = scaler.inverse_transform(next_year.reshape(-1, 1)).flatten()
-
-
-user_percentage_choice = 0.60
-
-monthly_extra = user_percentage_choice
-
-intervention = np.arange(1, 13) * monthly_extra
-
-
-next_months = pd.date_range(start=df.index[-1] + pd.offsets.MonthEnd(), periods=12, freq='ME')
-
-df_predicted = pd.DataFrame({
-    "Date": next_months,
-    "Future Net Worth": next_year
-})
-
-print(df_predicted)
\ No newline at end of file
+USER_DF_COLUMNS = ['income', 'expenses', 'investment', 'debt', 'debt_repay', 'checking',
+                   'savings', 'risk_score', 'fixed', 'variable', 'overall_expense']
+
+def month_row(month):
+    # Flatten one monthly_financial_history entry into a user_df_gen row
+    cash_flow = month.get('cash_flow')
+    expenses = cash_flow.get('expenses')
+    balance_sheet = month.get('balance_sheet_snapshot')
+    month_expense = expenses.get('total_outflow')
+
+    return (
+        cash_flow.get('income').get('total'),
+        month_expense,
+        balance_sheet.get('investments').get('total_investments'),
+        balance_sheet.get('debts').get('total_debt'),
+        expenses.get('debt_payments'),
+        balance_sheet.get('liquid_assets').get('checking_account'),
+        balance_sheet.get('liquid_assets').get('savings_account'),
+        np.nan,  # risk_score, filled in once the whole history is known
+        expenses.get('fixed'),
+        expenses.get('variable'),
+        month_expense + expenses.get('variable'),
+    )
+
+def build_user_df(months):
+    import pandas as pd
+
+    # Months can come straight from a stream; only the flattened rows are kept
+    user_data = pd.DataFrame([month_row(month) for month in months], columns=USER_DF_COLUMNS, dtype=float)
+    user_data.index.name = 'month'
+
+    user_data['risk_score'] = calc_risk(user_data)
+
+    return user_data
+
+def user_df_gen(path=DEFAULT_HISTORY_FILE, rollup=None):
+    months = (month for _, month in iter_months(path))
+    if rollup is not None:
+        # Cash flow derived from raw statements (cash_flow.CashFlowRollup) replaces the precomputed figures
+        months = rollup.apply_to_history(months)
+    return build_user_df(months)
+
+@lru_cache(maxsize=None)
+def history_files():
+    # user_id -> monthly history export for every alex2Y*.json next to this module
+    files = {}
+    for path in sorted(DATA_DIR.glob("alex2Y*.json")):
+        user_id, _ = next(iter_months(path), (None, None))
+        if user_id:
+            files[user_id] = path
+    return files
+
+############################################   Forecasting  ############################################################
+
+def _forecast_timer():
+    # Recorded in the app's /metrics; a no-op when backend.py runs without the ai package on the path
+    try:
+        from ai.utils.metrics import FORECAST_SECONDS
+    except ImportError:
+        return contextlib.nullcontext()
+    return FORECAST_SECONDS.time()
+
+def forecast_net_worth(df, n_periods=12, start="2023-01-01"):
+    with _forecast_timer():
+        return _forecast_net_worth(df, n_periods, start)
+
+def _forecast_net_worth(df, n_periods, start):
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from pmdarima import auto_arima
+
+    df.set_index(pd.date_range(start=start, periods=len(df), freq='ME'), inplace=True)
+    ts = df['cash_liquid'] - df['debt']
+    #ts_scaled = ts
+    scaler = StandardScaler()
+    ts_scaled = scaler.fit_transform(ts.values.reshape(-1, 1)).flatten()
+
+    predictor = auto_arima(
+        ts_scaled,
+        seasonal=True,
+        m=12,
+        D=1,
+        trace=False,
+        error_action='ignore',
+        suppress_warnings=True
+    )
+
+    next_year = predictor.predict(n_periods=n_periods)
+    next_year = scaler.inverse_transform(next_year.reshape(-1, 1)).flatten()
+
+    next_months = pd.date_range(start=df.index[-1] + pd.offsets.MonthEnd(), periods=n_periods, freq='ME')
+
+    return pd.DataFrame({
+        "Date": next_months,
+        "Future Net Worth": next_year
+    })
+
+
+@lru_cache(maxsize=None)
+def baseline_forecast(user_id, n_periods=12):
+    # Fitted once per user and process; the fit takes seconds and the history only changes on ingestion
+    path = history_files().get(user_id)
+    if path is None:
+        raise KeyError(f"No financial history for user {user_id}")
+
+    df = user_df_gen(path)
+    current_net_worth = float(df['cash_liquid'].iloc[-1] - df['debt'].iloc[-1])
+    df_predicted = forecast_net_worth(df, n_periods=n_periods)
+    predicted = df_predicted["Future Net Worth"].to_numpy(dtype=float)
+
+    return {
+        "current_net_worth": current_net_worth,
+        "predicted_net_worth_12mo": float(predicted[-1]),
+        "monthly_forecast": [
+            {"date": date.strftime("%Y-%m-%d"), "net_worth": float(value)}
+            for date, value in zip(df_predicted["Date"], predicted)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    df = user_df_gen()
+    print(df)
+
+    df_predicted = forecast_net_worth(df)
+
+    user_percentage_choice = 0.60
+
+    monthly_extra = user_percentage_choice
+
+    intervention = np.arange(1, 13) * monthly_extra
+
+    print(df_predicted)
\ No newline at end of file
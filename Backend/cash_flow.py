@@ -0,0 +1,189 @@
+"""
+Monthly cash-flow rollups derived from raw statement transactions.
+
+Rebuilds the `cash_flow` section of the `alex2Y*.json` histories (income total,
+fixed, variable, debt_payments, total_outflow) from a TransactionStore. Every user,
+month and bucket is aggregated in one `np.bincount` over the store. Later months
+can be appended one at a time without touching the history.
+
+The totals follow the precomputed histories: `total_outflow` is fixed spend plus
+debt payments, and variable spend is reported separately. user_df_gen adds it back
+as `overall_expense`.
+"""
+
+import numpy as np
+
+# Statement category -> cash-flow bucket. Unknown categories fall back on the
+# transaction type: credits count as income, debits as variable spend.
+CATEGORY_BUCKETS = {
+    "Income": "income",
+    "Rent": "fixed",
+    "Utilities": "fixed",
+    "Insurance": "fixed",
+    "Bills": "fixed",
+    "Debt": "debt_payments",
+    "Variable": "variable",
+}
+BUCKETS = ("income", "fixed", "variable", "debt_payments")
+_INCOME, _VARIABLE = BUCKETS.index("income"), BUCKETS.index("variable")
+
+
+def _bucket_lookup(categories) -> np.ndarray:
+    """Bucket code per category code, -1 where the transaction type decides."""
+    return np.array([BUCKETS.index(CATEGORY_BUCKETS[c]) if c in CATEGORY_BUCKETS else -1
+                     for c in categories], dtype=np.int8)
+
+
+def _row_buckets(lookup, category_codes, is_credit) -> np.ndarray:
+    buckets = lookup[category_codes] if len(lookup) else np.empty(0, dtype=np.int8)
+    return np.where(buckets >= 0, buckets, np.where(is_credit, _INCOME, _VARIABLE))
+
+
+def _period(month: np.datetime64) -> str:
+    return str(np.datetime64(month, 'M'))
+
+
+class CashFlowRollup:
+    """
+    One user's monthly cash flow, stored as an (n_months, 4) int64 array of cents
+    in BUCKETS order, indexed by `months` (datetime64[M], ascending).
+    """
+
+    def __init__(self, user_id: str, months, totals):
+        self.user_id = user_id
+        self.months = np.asarray(months, dtype='datetime64[M]')
+        self.totals = np.asarray(totals, dtype=np.int64).reshape(-1, len(BUCKETS))
+
+    def __len__(self):
+        return len(self.months)
+
+    # ---------------------------------------------------------
+    @classmethod
+    def from_store(cls, store, user_id: str) -> "CashFlowRollup":
+        """Roll up a single user's slice of a TransactionStore."""
+        lo, hi = store.user_bounds(user_id)
+        return rollup_store(store, rows=slice(lo, hi)).get(user_id, cls(user_id, [], []))
+
+    def append_month(self, transactions, period=None) -> dict:
+        """
+        Add one month of raw transactions (statement JSON dicts) and return its
+        cash-flow record. Replaces the month if it is already present; earlier
+        months are never recomputed. `period` ("YYYY-MM") defaults to the month of
+        the earliest transaction, so it is required for a month without any.
+        """
+        if period is None:
+            if not transactions:
+                raise ValueError("append_month needs a period when there are no transactions")
+            period = min(txn["date"] for txn in transactions)
+        month = np.datetime64(period, 'M')
+
+        categories = sorted({txn.get("category") or "Uncategorized" for txn in transactions})
+        codes = {c: i for i, c in enumerate(categories)}
+        buckets = _row_buckets(
+            _bucket_lookup(categories),
+            np.array([codes[txn.get("category") or "Uncategorized"] for txn in transactions], dtype=np.int16),
+            np.array([txn.get("type") == "credit" for txn in transactions], dtype=bool),
+        )
+        cents = np.abs(np.rint(np.array([float(txn["amount"]) for txn in transactions]) * 100)).astype(np.int64)
+        row = np.bincount(buckets, weights=cents, minlength=len(BUCKETS)).astype(np.int64)
+
+        i = int(np.searchsorted(self.months, month))
+        if i < len(self.months) and self.months[i] == month:
+            self.totals[i] = row
+        else:
+            self.months = np.insert(self.months, i, month)
+            self.totals = np.insert(self.totals, i, row, axis=0)
+        return self.month_record(i)
+
+    # ---------------------------------------------------------
+    def month_record(self, i: int) -> dict:
+        """Cash-flow record for row `i`, shaped like monthly_financial_history entries."""
+        income, fixed, variable, debt_payments = (int(v) / 100 for v in self.totals[i])
+        return {
+            "period": _period(self.months[i]),
+            "cash_flow": {
+                "income": {"total": income},
+                "expenses": {
+                    "fixed": fixed,
+                    "variable": variable,
+                    "debt_payments": debt_payments,
+                    "total_outflow": round(fixed + debt_payments, 2),
+                },
+            },
+        }
+
+    def to_months(self) -> list:
+        return [self.month_record(i) for i in range(len(self))]
+
+    def apply_to_history(self, history_months, start="2023-01"):
+        """
+        Overlay the derived cash flow onto `monthly_financial_history` entries.
+
+        History entries carry balance-sheet snapshots that statements can't provide.
+        Each entry is matched by its own `month` field: a "YYYY-MM" period, or the
+        1-based month number of the export, counted from `start`. The merged entries
+        go straight into backend.build_user_df, and from there into calc_risk and
+        forecast_net_worth.
+        """
+        first = np.datetime64(start, 'M')
+        for month in history_months:
+            period = _history_period(month, first)
+            i = int(np.searchsorted(self.months, period))
+            if i < len(self.months) and self.months[i] == period:
+                month = dict(month, cash_flow=self.month_record(i)["cash_flow"])
+            yield month
+
+
+def _history_period(entry: dict, first: np.datetime64) -> np.datetime64:
+    """Calendar month of a monthly_financial_history entry."""
+    month = entry.get("month")
+    if isinstance(month, str):
+        return np.datetime64(month[:7], 'M')
+    if isinstance(month, int) and not isinstance(month, bool) and month >= 1:
+        return first + (month - 1)
+    raise ValueError(f"History entry has no usable 'month' field: {month!r}")
+
+
+def rollup_store(store, rows=slice(None)) -> dict:
+    """
+    Roll up every user (or the `rows` slice) of a TransactionStore in one pass.
+
+    Returns {user_id: CashFlowRollup}; users only get the months they have
+    transactions in.
+    """
+    users = np.asarray(store.columns["user"][rows])
+    if not len(users):
+        return {}
+    months = np.asarray(store.columns["date"][rows]).astype('datetime64[M]')
+    buckets = _row_buckets(_bucket_lookup(store.categories.values),
+                           np.asarray(store.columns["category"][rows]),
+                           np.asarray(store.columns["is_credit"][rows]))
+    cents = np.abs(np.asarray(store.columns["amount_cents"][rows]))
+
+    first_month = months.min()
+    month_idx = (months - first_month).astype(np.int64)
+    user_ids, user_idx = np.unique(users, return_inverse=True)
+    n_months, n_buckets = int(month_idx.max()) + 1, len(BUCKETS)
+
+    # Single group-by over (user, month, bucket)
+    flat = (user_idx * n_months + month_idx) * n_buckets + buckets
+    totals = np.bincount(flat, weights=cents, minlength=len(user_ids) * n_months * n_buckets)
+    totals = np.rint(totals).astype(np.int64).reshape(len(user_ids), n_months, n_buckets)
+    active = np.zeros((len(user_ids), n_months), dtype=bool)
+    active[user_idx, month_idx] = True
+
+    all_months = first_month + np.arange(n_months)
+    rollups = {}
+    for u, code in enumerate(user_ids):
+        user_id = store.users[int(code)]
+        rollups[user_id] = CashFlowRollup(user_id, all_months[active[u]], totals[u][active[u]])
+    return rollups
+
+
+if __name__ == "__main__":
+    from statement_store import TransactionStore
+
+    for user_id, rollup in rollup_store(TransactionStore.from_statement_files()).items():
+        print(f"\n{user_id}")
+        for record in rollup.to_months():
+            print(f"  {record['period']}: {record['cash_flow']}")
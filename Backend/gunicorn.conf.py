@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for the CAPcoach backend.
+
+    cd Backend && gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is loaded and warmed up in the master (`preload_app`), then forked.
+Workers are `gthread`: chat and emotion requests spend most of their time
+waiting on Groq with the GIL released, so threads give the concurrency and the
+worker count covers the CPU-bound forecasting and JSON work.
+
+Conversation sessions live in process memory. Every request of a session must
+reach the worker that started it, so the default is one worker. Raise
+WEB_CONCURRENCY only behind a balancer with session affinity.
+
+Environment:
+    PORT              listen port (default 5001, as api.py)
+    WEB_CONCURRENCY   worker processes (default 1, see above)
+    GUNICORN_THREADS  threads per worker (default 4 per CPU, at most 32)
+    GUNICORN_TIMEOUT  seconds before a silent worker is restarted (default 120)
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", min(4 * (os.cpu_count() or 1), 32)))
+
+# Warm-up (forecast fits, lexicons, templates) runs once, before forking
+preload_app = True
+
+# A cold forecast fit or a video render can take tens of seconds
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+backlog = 2048
+
+# Worker heartbeats go to tmpfs, not a possibly slow disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Requests are logged by the app (structured logging, see ai/utils/logging_config.py)
+accesslog = None
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info("CAPcoach backend warmed up; %d worker(s) x %d threads on %s", workers, threads, bind)
@@ -0,0 +1,226 @@
+"""
+HTTP caching for the CAPcoach dashboard endpoints.
+
+* Strong ETags derived from a per-user data version (the user's history and statement
+  exports, plus an in-process counter that writers bump). A matching `If-None-Match`
+  gets an empty 304 without running the view.
+* A small server-side cache of rendered bodies keyed by ETag, so a different client
+  (or a cold browser cache) asking for unchanged data skips the view as well.
+* gzip / brotli compression of large JSON bodies, done once per ETag and encoding.
+  Brotli is used only when the `brotli` package is installed.
+
+Usage:
+
+    http_cache.init_app(app)
+
+    @app.route('/api/financial/transactions')
+    @http_cache.cached(max_age=300, user_id=request_user_id)
+    def transactions(): ...
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from importlib.util import find_spec
+
+from flask import Response, make_response, request
+
+BROTLI_AVAILABLE = find_spec("brotli") is not None
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+MAX_CACHED_BODIES = 256
+COMPRESSIBLE_TYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+# ETag suffix per content coding, so each representation has its own strong tag
+_ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+_versions = {}
+# (mtime_ns, size) of each data file when data_version last looked at it
+_file_stats = {}
+_bodies = OrderedDict()
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+def clear_data_caches() -> None:
+    """
+    Drop the process-wide caches built from the data files (history index,
+    statement store, forecasts, spending profiles), so the next request rereads
+    the files instead of serving the old data under a new ETag.
+    """
+    from backend import baseline_forecast, history_files
+    from savings_target import spending_profile
+    from statement_store import default_store
+
+    for cache in (history_files, default_store, baseline_forecast, spending_profile):
+        cache.cache_clear()
+
+
+def bump_version(user_id: str) -> None:
+    """Invalidate every cached response for `user_id` (call after writing their data)."""
+    with _lock:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+    clear_data_caches()
+
+
+def data_version(user_id: str) -> str:
+    """
+    Version string for everything a user's responses are computed from. Changes
+    whenever their history file or a statement export is rewritten, or on bump_version.
+    A rewritten file also clears the in-process data caches (clear_data_caches).
+    """
+    from backend import history_files
+    from statement_store import STATEMENT_FILES
+
+    parts = [str(_versions.get(user_id, 0))]
+    stats = {}
+    history = history_files().get(user_id)
+    for path in ([history] if history else []) + list(STATEMENT_FILES):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+        parts.append(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}")
+
+    with _lock:
+        changed = any(_file_stats.get(path, seen) != seen for path, seen in stats.items())
+        _file_stats.update(stats)
+    if changed:
+        clear_data_caches()
+    return "|".join(parts)
+
+
+def _etag(user_id, version: str) -> str:
+    key = "\0".join([request.endpoint or "", request.full_path, str(user_id), version])
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def _client_match(etag: str):
+    """
+    The tag from If-None-Match that names the representation this request would
+    get: `etag` itself, or `etag` with the suffix of the encoding the client
+    accepts now. None if there is no such tag.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    encoding = _choose_encoding()
+    current = {etag, etag + _ENCODING_SUFFIX[encoding]} if encoding else {etag}
+    for tag in if_none_match.as_set():
+        if tag in current:
+            return tag
+    return None
+
+
+def _remember(key, value) -> None:
+    with _lock:
+        _bodies[key] = value
+        _bodies.move_to_end(key)
+        while len(_bodies) > MAX_CACHED_BODIES:
+            _bodies.popitem(last=False)
+
+
+def _recall(key):
+    with _lock:
+        value = _bodies.get(key)
+        if value is not None:
+            _bodies.move_to_end(key)
+        return value
+
+
+# ---------------------------------------------------------
+def cached(max_age: int, user_id=None, private: bool = True, version=None):
+    """
+    Decorate a GET view whose output depends only on the URL and the user's data.
+
+    `user_id` is a callable returning the user the request is for (None for views
+    that don't depend on user data); `max_age` is how long, in seconds, the browser
+    may reuse the response before revalidating. Views that depend on other state
+    pass `version`, a callable returning a string that changes whenever the output
+    does; it replaces the user's data version.
+    """
+    cache_control = f"{'private' if private else 'public'}, max-age={max_age}"
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user = user_id() if user_id else None
+            if version is not None:
+                etag = _etag(user, version())
+            else:
+                etag = _etag(user, data_version(user) if user else "")
+
+            matched = _client_match(etag)
+            if matched is not None:
+                # The tag of the 200 it revalidates, content-coding suffix included
+                response = Response(status=304)
+                etag = matched
+            else:
+                hit = _recall(etag)
+                if hit is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    _remember(etag, (response.get_data(), response.mimetype))
+                else:
+                    body, mimetype = hit
+                    response = Response(body, mimetype=mimetype)
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = cache_control
+            response.vary.add("Accept-Encoding")
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------
+def _choose_encoding():
+    accept = request.accept_encodings
+    if BROTLI_AVAILABLE and accept.quality("br") > 0:
+        return "br"
+    if accept.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compress large text/JSON bodies the client accepts."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    encoding = _choose_encoding()
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    compressed = _recall((etag, encoding)) if etag else None
+    if compressed is None:
+        compressed = _compress(body, encoding)
+        if etag:
+            _remember((etag, encoding), compressed)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(etag + _ENCODING_SUFFIX[encoding])
+    return response
+
+
+def init_app(app) -> None:
+    app.after_request(compress_response)
@@ -0,0 +1,96 @@
+"""
+Opt-in orjson JSON provider for the CAPcoach Flask app.
+
+`jsonify` normally goes through the stdlib encoder in pure Python and rejects NumPy
+values, so forecasts and risk scores have to be converted by hand. This provider uses
+orjson and serializes these types without conversion:
+
+* NumPy arrays (native, C-contiguous numeric dtypes) and NumPy scalars
+* `datetime`, `date`, `time` and `uuid.UUID`
+* Pydantic models such as `ConversationTurn` and `DiagnosisSummary`
+* `Decimal`, `set`/`frozenset` and `Path` via `_default`
+
+Enable it with `CAPCOACH_JSON=orjson` (or `app.config["JSON_PROVIDER"] = "orjson"`).
+Without orjson installed, the app keeps Flask's default provider.
+
+Differences from the default provider: NaN/Infinity become `null` instead of invalid
+JSON, and datetimes use ISO 8601 instead of RFC 822.
+"""
+
+import logging
+import os
+from decimal import Decimal
+from importlib.util import find_spec
+from pathlib import PurePath
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+ORJSON_AVAILABLE = find_spec("orjson") is not None
+
+
+def _default(obj):
+    """Fallback for types orjson doesn't serialize natively."""
+    if hasattr(obj, "model_dump"):        # pydantic v2
+        return obj.model_dump()
+    if hasattr(obj, "dict") and hasattr(obj, "__fields__"):   # pydantic v1
+        return obj.dict()
+    if hasattr(obj, "tolist"):            # NumPy scalars and arrays orjson skipped
+        return obj.tolist()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (keeps `sort_keys` and `compact` semantics)."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _option(self, sort_keys: bool, indent: bool) -> int:
+        option = self._options
+        if sort_keys:
+            option |= self._orjson.OPT_SORT_KEYS
+        if indent:
+            option |= self._orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent: bool = False) -> bytes:
+        return self._orjson.dumps(obj, default=_default, option=self._option(self.sort_keys, indent))
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = self._option(kwargs.get("sort_keys", self.sort_keys), bool(kwargs.get("indent")))
+        return self._orjson.dumps(obj, default=_default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Hand orjson's bytes straight to the response instead of round-tripping through str
+        body = self.dumps_bytes(obj, indent) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_app(app) -> bool:
+    """Install ORJSONProvider if enabled and available. Returns True if installed."""
+    choice = app.config.get("JSON_PROVIDER") or os.getenv("CAPCOACH_JSON", "default")
+    if choice.lower() != "orjson":
+        return False
+    if not ORJSON_AVAILABLE:
+        logger.warning("CAPCOACH_JSON=orjson but orjson is not installed - using the default JSON provider")
+        return False
+    app.json = ORJSONProvider(app)
+    return True
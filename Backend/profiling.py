@@ -0,0 +1,246 @@
+"""
+Per-request profiling for the CAPcoach Flask app.
+
+A request is profiled when it carries `X-Profile: <CAPCOACH_PROFILE_TOKEN>`
+(no token configured = header ignored), or when it is picked at random at
+`CAPCOACH_PROFILE_SAMPLE` (default 0, off). Two profilers are available:
+
+* `sample` (default): a background thread records the request thread's stack
+  every `CAPCOACH_PROFILE_INTERVAL_MS` and writes collapsed stacks
+  (`frame;frame;frame count` lines) to `<dir>/*.collapsed`. Feed them to
+  flamegraph.pl, speedscope or inferno for a flame graph. The overhead is the
+  sampler thread only; the profiled code runs unmodified.
+* `cprofile`: deterministic cProfile of the request thread, written as
+  `<dir>/*.prof` (open with `python -m pstats` or snakeviz). Exact call counts,
+  but every Python call is slowed down.
+
+Profiles of requests faster than `CAPCOACH_PROFILE_MIN_MS` are discarded, so a
+sample rate can stay on in production and only keep the slow forecasting and
+video requests. Files are written after the response has been sent. The
+directory is kept under `CAPCOACH_PROFILE_MAX_MB` by deleting the oldest
+profiles. At most one request per process is profiled at a time; others run
+normally.
+
+Usage:
+
+    profiling.init_app(app)
+
+    curl -H "X-Profile: $CAPCOACH_PROFILE_TOKEN" -H "X-Profile-Mode: cprofile" ...
+
+The response of a profiled request names its file in `X-Profile-Id`.
+"""
+
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODES = ("sample", "cprofile")
+PROFILE_SUFFIXES = (".collapsed", ".prof")
+
+_slots = threading.BoundedSemaphore(1)
+_retention_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    try:
+        filename = str(Path(filename).relative_to(PROJECT_ROOT))
+    except ValueError:
+        # Library frames: keep the path from the package name on
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._labels = {}
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _CProfiler:
+    """cProfile with the same start/stop/write interface as StackSampler."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path: Path):
+        self.profile.dump_stats(str(path))
+
+
+# ---------------------------------------------------------
+def _settings(app) -> dict:
+    config = app.config
+    return {
+        "sample_rate": float(config.get("PROFILE_SAMPLE_RATE", os.getenv("CAPCOACH_PROFILE_SAMPLE", "0"))),
+        "token": config.get("PROFILE_TOKEN", os.getenv("CAPCOACH_PROFILE_TOKEN", "")),
+        "mode": config.get("PROFILE_MODE", os.getenv("CAPCOACH_PROFILE_MODE", "sample")),
+        "interval": float(config.get("PROFILE_INTERVAL_MS", os.getenv("CAPCOACH_PROFILE_INTERVAL_MS", "5"))) / 1000,
+        "min_ms": float(config.get("PROFILE_MIN_MS", os.getenv("CAPCOACH_PROFILE_MIN_MS", "0"))),
+        "directory": Path(config.get("PROFILE_DIR", os.getenv("CAPCOACH_PROFILE_DIR", PROJECT_ROOT / "profiles"))),
+        "max_bytes": float(config.get("PROFILE_MAX_MB", os.getenv("CAPCOACH_PROFILE_MAX_MB", "50"))) * 1024 * 1024,
+    }
+
+
+def _requested(settings: dict) -> bool:
+    header = request.headers.get("X-Profile")
+    if header and settings["token"]:
+        return hmac.compare_digest(header, settings["token"])
+    rate = settings["sample_rate"]
+    return rate > 0 and (rate >= 1.0 or random.random() < rate)
+
+
+def enforce_retention(directory: Path, max_bytes: float) -> int:
+    """Delete the oldest profiles until `directory` holds at most `max_bytes`. Returns files removed."""
+    with _retention_lock:
+        files = []
+        for path in directory.iterdir():
+            if path.suffix in PROFILE_SUFFIXES:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def _profile_name(mode: str, duration_ms: float) -> str:
+    endpoint = re.sub(r"[^\w.-]", "_", request.endpoint or "unmatched")
+    trace = g.get("trace")
+    request_id = trace.request_id if trace is not None else f"{random.getrandbits(32):08x}"
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}-{endpoint}-{duration_ms:.0f}ms-{request_id}" + (".prof" if mode == "cprofile" else ".collapsed")
+
+
+# ---------------------------------------------------------
+def start_profile():
+    settings = current_app.extensions["profiling"]
+    if not _requested(settings) or not _slots.acquire(blocking=False):
+        return
+    mode = request.headers.get("X-Profile-Mode", settings["mode"])
+    if mode not in MODES:
+        mode = "sample"
+    profiler = _CProfiler() if mode == "cprofile" else StackSampler(threading.get_ident(), settings["interval"])
+    try:
+        profiler.start()
+    except ValueError:
+        # Another profiler (a debugger, coverage on 3.12+) owns the interpreter hooks
+        _slots.release()
+        return
+    g.profile = (profiler, mode, time.perf_counter())
+
+
+def _finish(response=None):
+    active = g.pop("profile", None)
+    if active is None:
+        return response
+    profiler, mode, started = active
+    try:
+        profiler.stop()
+    finally:
+        _slots.release()
+    duration_ms = (time.perf_counter() - started) * 1000
+    settings = current_app.extensions["profiling"]
+    if response is None or duration_ms < settings["min_ms"]:
+        return response
+
+    path = settings["directory"] / _profile_name(mode, duration_ms)
+    response.headers["X-Profile-Id"] = path.name
+
+    def write():
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.write(path)
+            enforce_retention(path.parent, settings["max_bytes"])
+            logger.info("Request profile written", extra={"path": str(path), "mode": mode,
+                                                          "duration_ms": round(duration_ms, 1)})
+        except OSError as e:
+            logger.warning("Could not write request profile", extra={"path": str(path), "error": str(e)})
+
+    # After the body has gone out, so the client doesn't wait on the disk
+    response.call_on_close(write)
+    return response
+
+
+def stop_profile(response):
+    return _finish(response)
+
+
+def discard_profile(error=None):
+    # The view raised before after_request ran; stop the profiler without writing
+    _finish()
+
+
+def init_app(app) -> None:
+    """Register the profiling hooks; settings are read from app.config or the environment once."""
+    app.extensions["profiling"] = _settings(app)
+    app.before_request(start_profile)
+    app.after_request(stop_profile)
+    app.teardown_request(discard_profile)
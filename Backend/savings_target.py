@@ -0,0 +1,140 @@
+"""
+Net-worth target solver for the CapCoach planner.
+
+Server-side version of `calculateSavingsForTarget` in Capcoach.jsx. Given a user's
+fitted 12-month baseline forecast and one or more target growth percentages, it
+returns the extra monthly savings each target needs, that amount as a share of income,
+whether cuts to variable spending can cover it, and the largest reachable target.
+
+The per-user inputs (income, variable spend by category, baseline forecast) are cached,
+so each request is a handful of NumPy operations.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from backend import baseline_forecast, history_files
+from stream_json import iter_months
+from statement_store import default_store
+
+# Share of variable spending we assume can be cut (the planner's 40-50% caps, averaged)
+MAX_CUT_SHARE = 0.45
+# Months of statements averaged for the spending profile
+RECENT_MONTHS = 3
+
+# Merchant keywords used to split "Variable" debits, in priority order (as Capcoach.jsx)
+SPENDING_CATEGORIES = [
+    ("dining", ("restaurant", "bar", "grill", "eats", "valentine's")),
+    ("entertainment", ("concert", "gaming", "entertainment", "ticket")),
+    ("shopping", ("target", "purchase", "electronics")),
+    ("transportation", ("uber", "shell", "gas")),
+]
+
+
+def spending_category(description: str) -> str:
+    merchant = description.lower()
+    for category, keywords in SPENDING_CATEGORIES:
+        if any(keyword in merchant for keyword in keywords):
+            return category
+    return "other"
+
+
+@lru_cache(maxsize=None)
+def spending_profile(user_id: str) -> dict:
+    """
+    Latest monthly income and the average monthly variable spend per spending
+    category over the last RECENT_MONTHS statements.
+    """
+    path = history_files().get(user_id)
+    if path is None:
+        raise KeyError(f"No financial history for user {user_id}")
+    latest_month = None
+    for _, month in iter_months(path):
+        latest_month = month
+    income = float(latest_month["cash_flow"]["income"]["total"])
+
+    store = default_store()
+    lo, hi = store.user_bounds(user_id)
+    columns = {name: np.asarray(values[lo:hi]) for name, values in store.columns.items()}
+    months = columns["date"].astype('datetime64[M]')
+    recent = np.unique(months)[-RECENT_MONTHS:]
+
+    variable_code = store.categories.code("Variable")
+    mask = (columns["category"] == variable_code) & ~columns["is_credit"] & np.isin(months, recent)
+
+    # Classify each distinct description once, then sum per spending category
+    names = [category for category, _ in SPENDING_CATEGORIES] + ["other"]
+    description_category = np.array(
+        [names.index(spending_category(d)) for d in store.descriptions.values], dtype=np.int8
+    )
+    totals = np.bincount(description_category[columns["description"][mask]],
+                         weights=np.abs(columns["amount_cents"][mask]), minlength=len(names))
+
+    by_category = {name: float(total) / 100 / RECENT_MONTHS for name, total in zip(names, totals) if total}
+    return {
+        "avg_monthly_income": income,
+        "variable_spending_by_category": by_category,
+        "max_monthly_savings": sum(by_category.values()) * MAX_CUT_SHARE,
+    }
+
+
+def solve_targets(baseline_predicted: float, target_growth_percent, avg_monthly_income: float,
+                  max_monthly_savings: float) -> dict:
+    """
+    Vectorized over `target_growth_percent` (scalar or sequence).
+
+    Growth is applied to |baseline| so that +10% always moves a negative net worth
+    towards zero, matching the planner UI.
+
+    Ratios without a meaningful denominator are None (JSON null), never inf/NaN:
+    `max_target_growth_percent` when the baseline is 0, and `percentage_of_income`
+    when there is no income. Non-finite inputs raise ValueError.
+    """
+    targets = np.atleast_1d(np.asarray(target_growth_percent, dtype=float))
+    if not np.isfinite(targets).all() or not np.isfinite(baseline_predicted):
+        raise ValueError("target_growth_percent and baseline_predicted must be finite numbers")
+    scale = abs(baseline_predicted)
+
+    additional_growth = scale * targets / 100
+    monthly_savings = additional_growth / 12
+    if avg_monthly_income > 0:
+        share_of_income = [float(share) for share in monthly_savings / avg_monthly_income * 100]
+    else:
+        share_of_income = [None] * len(targets)
+
+    max_additional_growth = max_monthly_savings * 12
+    max_target_percent = max_additional_growth / scale * 100 if scale > 0 else None
+
+    return {
+        "baseline_predicted": baseline_predicted,
+        "max_monthly_savings": max_monthly_savings,
+        "max_additional_growth": max_additional_growth,
+        "max_target_net_worth": baseline_predicted + max_additional_growth,
+        "max_target_growth_percent": max_target_percent,
+        "targets": [
+            {
+                "target_growth_percent": float(pct),
+                "target_net_worth": float(baseline_predicted + growth),
+                "additional_growth_needed": float(growth),
+                "required_monthly_savings": float(monthly),
+                "percentage_of_income": share,
+                "is_achievable": bool(monthly <= max_monthly_savings),
+            }
+            for pct, growth, monthly, share in zip(targets, additional_growth, monthly_savings, share_of_income)
+        ],
+    }
+
+
+def savings_plan(user_id: str, target_growth_percent, baseline_predicted=None) -> dict:
+    """Solve targets for a user from the cached forecast and spending profile."""
+    profile = spending_profile(user_id)
+    if baseline_predicted is None:
+        baseline_predicted = baseline_forecast(user_id)["predicted_net_worth_12mo"]
+
+    plan = solve_targets(float(baseline_predicted), target_growth_percent,
+                         profile["avg_monthly_income"], profile["max_monthly_savings"])
+    plan["user_id"] = user_id
+    plan["avg_monthly_income"] = profile["avg_monthly_income"]
+    plan["variable_spending_by_category"] = profile["variable_spending_by_category"]
+    return plan
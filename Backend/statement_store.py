@@ -0,0 +1,340 @@
+"""
+Columnar transaction store for CAPcoach bank statements.
+
+Parses the `alex_*_statement.json` exports (statements[].transactions[], streamed
+via stream_json) into one NumPy array per column:
+
+    user          int32           index into TransactionStore.users
+    date          datetime64[D]
+    amount_cents  int64           signed, debits are negative
+    category      int16           index into TransactionStore.categories
+    description   int32           index into TransactionStore.descriptions
+    is_credit     bool
+
+Rows are sorted by (user, date), so each user's transactions are one contiguous slice
+and the row number doubles as the date index. A secondary index, built at ingestion,
+orders row ids by (user, category, date) so a category filter is also a contiguous
+slice. A saved store is a directory of `.npy` files plus `meta.json` with the
+vocabularies; loading it memory-maps the columns, so queries over years of history
+never touch the original JSON.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from stream_json import iter_transactions
+
+DATA_DIR = Path(__file__).parent
+STATEMENT_FILES = sorted(DATA_DIR.glob("alex_*_statement.json"))
+DEFAULT_STORE_DIR = DATA_DIR / "transaction_store"
+CHUNK_ROWS = 1 << 16
+PAGE_SCAN_BLOCK = 256
+
+COLUMNS = {
+    "user": np.int32,
+    "date": "datetime64[D]",
+    "amount_cents": np.int64,
+    "category": np.int16,
+    "description": np.int32,
+    "is_credit": np.bool_,
+}
+
+
+class Vocabulary:
+    """Maps strings to dense integer codes (categorical encoding)."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str):
+        """Return the code for `value`, or None if it was never seen."""
+        return self._codes.get(value)
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def to_cents(amount) -> int:
+    """Convert a JSON dollar amount to integer cents without float drift."""
+    return int(round(float(amount) * 100))
+
+
+class _ColumnBuilder:
+    """Collects rows in short Python lists and packs them into NumPy chunks."""
+
+    def __init__(self, chunk_rows: int = CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self.pending = {name: [] for name in COLUMNS}
+        self.chunks = {name: [] for name in COLUMNS}
+
+    def append(self, *row) -> None:
+        for name, value in zip(COLUMNS, row):
+            self.pending[name].append(value)
+        if len(self.pending["user"]) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        for name, values in self.pending.items():
+            self.chunks[name].append(np.asarray(values, dtype=COLUMNS[name]))
+            values.clear()
+
+    def finish(self) -> dict:
+        self._flush()
+        return {name: np.concatenate(chunks) for name, chunks in self.chunks.items()}
+
+
+class TransactionStore:
+    """
+    Column arrays for every user's transactions plus the vocabularies that decode them.
+    """
+
+    def __init__(self, columns, users, categories, descriptions, indexes=None):
+        self.columns = columns
+        self.users = users if isinstance(users, Vocabulary) else Vocabulary(users)
+        self.categories = categories if isinstance(categories, Vocabulary) else Vocabulary(categories)
+        self.descriptions = descriptions if isinstance(descriptions, Vocabulary) else Vocabulary(descriptions)
+        self.indexes = indexes if indexes is not None else self._build_indexes()
+        self._descriptions_lower = None
+
+    def __len__(self):
+        return len(self.columns["user"])
+
+    # ---------------------------------------------------------
+    @classmethod
+    def from_statement_files(cls, paths=None) -> "TransactionStore":
+        """
+        Parse statement exports (JSON documents or NDJSON) into a new store.
+
+        Files are streamed statement by statement, and rows are packed into NumPy
+        chunks as they arrive, so peak memory stays near the size of the final columns.
+        """
+        users, categories, descriptions = Vocabulary(), Vocabulary(), Vocabulary()
+        builder = _ColumnBuilder()
+
+        for path in paths or STATEMENT_FILES:
+            for user_id, _, txn in iter_transactions(path):
+                builder.append(
+                    users.encode(user_id or Path(path).stem),
+                    txn["date"],
+                    to_cents(txn["amount"]),
+                    categories.encode(txn.get("category") or "Uncategorized"),
+                    descriptions.encode(txn.get("description", "")),
+                    txn.get("type") == "credit",
+                )
+
+        return cls(cls._sorted(builder.finish()), users, categories, descriptions)
+
+    @staticmethod
+    def _sorted(columns):
+        # Stable sort keeps statement order for transactions on the same day
+        order = np.lexsort((columns["date"], columns["user"]))
+        return {name: values[order] for name, values in columns.items()}
+
+    def _build_indexes(self) -> dict:
+        # Stable sort: within a (user, category) run, row ids (and so dates) stay ascending
+        users, categories = self.columns["user"], self.columns["category"]
+        order = np.lexsort((categories, users))
+        return {
+            "category_rows": order.astype(np.int64),
+            "category_keys": users[order].astype(np.int64) * max(len(self.categories), 1) + categories[order],
+            "category_dates": self.columns["date"][order],
+        }
+
+    # ---------------------------------------------------------
+    def save(self, directory=DEFAULT_STORE_DIR) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, values in self.columns.items():
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(values))
+        for name, values in self.indexes.items():
+            np.save(directory / f"index_{name}.npy", np.ascontiguousarray(values))
+        meta = {
+            "rows": len(self),
+            "users": self.users.values,
+            "categories": self.categories.values,
+            "descriptions": self.descriptions.values,
+        }
+        with open(directory / "meta.json", 'w') as fp:
+            json.dump(meta, fp)
+        return directory
+
+    @classmethod
+    def load(cls, directory=DEFAULT_STORE_DIR, mmap: bool = True) -> "TransactionStore":
+        """Open a saved store. With `mmap` the columns are paged in on demand."""
+        directory = Path(directory)
+        with open(directory / "meta.json", 'r') as fp:
+            meta = json.load(fp)
+        mode = 'r' if mmap else None
+        columns = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in COLUMNS}
+        index_files = {name: directory / f"index_{name}.npy"
+                       for name in ("category_rows", "category_keys", "category_dates")}
+        indexes = None
+        if all(path.exists() for path in index_files.values()):
+            indexes = {name: np.load(path, mmap_mode=mode) for name, path in index_files.items()}
+        return cls(columns, meta["users"], meta["categories"], meta["descriptions"], indexes)
+
+    # ---------------------------------------------------------
+    def user_bounds(self, user_id: str):
+        """Return the (start, stop) row range for a user; empty if unknown."""
+        code = self.users.code(user_id)
+        if code is None:
+            return 0, 0
+        user_col = self.columns["user"]
+        return (int(np.searchsorted(user_col, code, side='left')),
+                int(np.searchsorted(user_col, code, side='right')))
+
+    def _window(self, user_id=None, start=None, end=None):
+        """Row range for an optional user and inclusive [start, end] date window."""
+        lo, hi = self.user_bounds(user_id) if user_id is not None else (0, len(self))
+        if user_id is None or (start is None and end is None):
+            return lo, hi, start, end
+        # Within one user the rows are date-sorted, so the window is a binary search
+        dates = self.columns["date"]
+        if start is not None:
+            lo += int(np.searchsorted(dates[lo:hi], np.datetime64(start, 'D'), side='left'))
+        if end is not None:
+            hi = lo + int(np.searchsorted(dates[lo:hi], np.datetime64(end, 'D'), side='right'))
+        return lo, hi, None, None
+
+    def category_spend(self, user_id=None, start=None, end=None) -> dict:
+        """
+        Total debit spend per category in dollars, optionally for one user and an
+        inclusive date range (ISO strings or datetime64).
+        """
+        lo, hi, start, end = self._window(user_id, start, end)
+        amounts = self.columns["amount_cents"][lo:hi]
+        categories = self.columns["category"][lo:hi]
+        mask = amounts < 0
+        if start is not None or end is not None:
+            # Across users dates are only sorted per user, so filter instead
+            dates = self.columns["date"][lo:hi]
+            if start is not None:
+                mask &= dates >= np.datetime64(start, 'D')
+            if end is not None:
+                mask &= dates <= np.datetime64(end, 'D')
+
+        totals = np.bincount(categories[mask], weights=-amounts[mask], minlength=len(self.categories))
+        return {self.categories[code]: round(float(cents) / 100, 2) for code, cents in enumerate(totals) if cents}
+
+    # ---------------------------------------------------------
+    def _description_matches(self, text: str) -> np.ndarray:
+        """Boolean mask over the description vocabulary for a case-insensitive substring."""
+        if self._descriptions_lower is None:
+            self._descriptions_lower = [d.lower() for d in self.descriptions.values]
+        text = text.lower()
+        return np.fromiter((text in d for d in self._descriptions_lower), dtype=bool,
+                           count=len(self._descriptions_lower))
+
+    def transaction(self, row: int) -> dict:
+        amount = int(self.columns["amount_cents"][row])
+        return {
+            "id": int(row),
+            "date": str(self.columns["date"][row]),
+            "description": self.descriptions[int(self.columns["description"][row])],
+            "amount": amount / 100,
+            "category": self.categories[int(self.columns["category"][row])],
+            "type": "credit" if self.columns["is_credit"][row] else "debit",
+        }
+
+    def page(self, user_id: str, limit: int = 50, cursor=None, start=None, end=None, category=None,
+             min_amount=None, max_amount=None, search=None, descending: bool = True) -> dict:
+        """
+        One keyset-paginated page of a user's transactions.
+
+        `cursor` is the `next_cursor` of the previous page (the row id of its last
+        transaction). The user's slice, or the (user, category) slice of the category
+        index, plus the date window are all found by binary search; only amount
+        (absolute dollars) and description search are checked row by row, in blocks,
+        until the page is full.
+        """
+        code = self.users.code(user_id)
+        if code is None:
+            return {"transactions": [], "next_cursor": None}
+
+        if category is not None:
+            category_code = self.categories.code(category)
+            if category_code is None:
+                return {"transactions": [], "next_cursor": None}
+            keys = self.indexes["category_keys"]
+            key = code * max(len(self.categories), 1) + category_code
+            lo, hi = int(np.searchsorted(keys, key, 'left')), int(np.searchsorted(keys, key, 'right'))
+            row_ids = self.indexes["category_rows"][lo:hi]
+            dates = self.indexes["category_dates"][lo:hi]
+            position = lambda row, side: int(np.searchsorted(row_ids, row, side))
+        else:
+            lo, hi = self.user_bounds(user_id)
+            row_ids = None
+            dates = self.columns["date"][lo:hi]
+            position = lambda row, side: min(max(row - lo + (side == 'right'), 0), hi - lo)
+
+        a = int(np.searchsorted(dates, np.datetime64(start, 'D'), 'left')) if start is not None else 0
+        b = int(np.searchsorted(dates, np.datetime64(end, 'D'), 'right')) if end is not None else len(dates)
+        if cursor is not None:
+            if descending:
+                b = min(b, position(int(cursor), 'left'))
+            else:
+                a = max(a, position(int(cursor), 'right'))
+
+        matches = self._description_matches(search) if search else None
+        min_cents = to_cents(min_amount) if min_amount is not None else None
+        max_cents = to_cents(max_amount) if max_amount is not None else None
+
+        found = []
+        block = max(PAGE_SCAN_BLOCK, limit + 1)
+        while a < b and len(found) <= limit:
+            if descending:
+                block_lo, block_hi = max(a, b - block), b
+                b = block_lo
+            else:
+                block_lo, block_hi = a, min(b, a + block)
+                a = block_hi
+            rows = row_ids[block_lo:block_hi] if row_ids is not None else np.arange(lo + block_lo, lo + block_hi)
+            keep = np.ones(len(rows), dtype=bool)
+            if min_cents is not None or max_cents is not None:
+                amounts = np.abs(self.columns["amount_cents"][rows])
+                if min_cents is not None:
+                    keep &= amounts >= min_cents
+                if max_cents is not None:
+                    keep &= amounts <= max_cents
+            if matches is not None:
+                keep &= matches[self.columns["description"][rows]]
+            rows = rows[keep]
+            found.extend((rows[::-1] if descending else rows).tolist())
+
+        page_rows = found[:limit]
+        has_more = len(found) > limit
+        return {
+            "transactions": [self.transaction(row) for row in page_rows],
+            "next_cursor": str(page_rows[-1]) if has_more else None,
+        }
+
+
+@lru_cache(maxsize=None)
+def default_store() -> TransactionStore:
+    """Process-wide store for the bundled statement exports, built on first use."""
+    return TransactionStore.from_statement_files()
+
+
+if __name__ == "__main__":
+    store = TransactionStore.from_statement_files()
+    path = store.save()
+    store = TransactionStore.load(path)
+    print(f"📦 {len(store)} transactions for {len(store.users)} users saved to {path}")
+    for user_id in store.users.values:
+        print(f"\n{user_id}")
+        for category, total in sorted(store.category_spend(user_id).items(), key=lambda x: -x[1]):
+            print(f"  {category:<12} ${total:>10,.2f}")
@@ -0,0 +1,164 @@
+"""
+Streaming readers for CAPcoach history and statement exports.
+
+Cohort exports can run to hundreds of MB, so instead of `json.load` these readers
+walk the top-level object incrementally and yield one month / statement /
+transaction at a time. Only the element currently being decoded is held in memory,
+and callers can start working before the rest of the file has been read.
+
+Two layouts are supported:
+
+* A regular JSON document (`alex2Y*.json`, `alex_*_statement.json`). The large
+  arrays (`monthly_financial_history`, `statements`) are streamed element by
+  element; every other top-level value is decoded whole.
+* Newline-delimited JSON (`.ndjson` / `.jsonl`), one month or statement object per
+  line. Lines may carry a `user_id`, so one file can hold a whole cohort.
+"""
+
+import json
+from pathlib import Path
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Characters a JSON number can continue with after raw_decode has accepted a prefix of it
+_NUMBER_CHARS = set("0123456789+-.eE")
+
+
+class _StreamReader:
+    """Incremental `raw_decode` over a text stream with a bounded look-ahead buffer."""
+
+    def __init__(self, fp, chunk_size: int = CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has already been consumed so the buffer stays bounded
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found or 'EOF'!r}")
+        self.pos += 1
+
+    def decode(self):
+        """Decode one complete JSON value starting at the next non-whitespace char."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number is only complete once a delimiter follows it: if everything left in
+            # the buffer could still belong to it ("1" of "1.5e3"), read more and decode again
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and all(c in _NUMBER_CHARS for c in self.buf[end:]) and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_top_level(fp, stream_keys=(), chunk_size: int = CHUNK_SIZE):
+    """
+    Walk a top-level JSON object and yield `(key, value)` pairs.
+
+    For keys in `stream_keys` whose value is an array, one `(key, element)` pair is
+    yielded per element instead of materializing the array.
+    """
+    reader = _StreamReader(fp, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        if key in stream_keys and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() != "]":
+                while True:
+                    yield key, reader.decode()
+                    if reader.peek() != ",":
+                        break
+                    reader.expect(",")
+            reader.expect("]")
+        else:
+            yield key, reader.decode()
+
+        if reader.peek() != ",":
+            break
+        reader.expect(",")
+    reader.expect("}")
+
+
+def iter_ndjson(fp):
+    """Yield one decoded object per non-blank line."""
+    for line_number, line in enumerate(fp, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+
+
+def _iter_records(path, array_key: str):
+    """Yield `(user_id, record)` for each element of `array_key` (or each NDJSON line)."""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as fp:
+        if path.suffix in NDJSON_SUFFIXES:
+            for record in iter_ndjson(fp):
+                yield record.get("user_id"), record
+            return
+
+        # Exports put user_id before the arrays; if it comes later it's reported as None
+        user_id = None
+        for key, value in iter_top_level(fp, stream_keys=(array_key,)):
+            if key == "user_id":
+                user_id = value
+            elif key == array_key:
+                yield user_id, value
+
+
+def iter_months(path):
+    """Yield `(user_id, month)` for each `monthly_financial_history` entry."""
+    return _iter_records(path, "monthly_financial_history")
+
+
+def iter_statements(path):
+    """Yield `(user_id, statement)` for each monthly statement."""
+    return _iter_records(path, "statements")
+
+
+def iter_transactions(path):
+    """Yield `(user_id, statement_period, transaction)` as each statement is parsed."""
+    for user_id, statement in iter_statements(path):
+        period = statement.get("statement_period")
+        for txn in statement.get("transactions", []):
+            yield user_id, period, txn
@@ -0,0 +1,21 @@
+"""Chunk-boundary tests for stream_json. Run from Backend/: python -m pytest -q"""
+
+import io
+import json
+
+import pytest
+
+from stream_json import iter_top_level
+
+NUMBERS = [0, -7, 12345, 1.5, -0.25, 3.14159, 1e10, 2.5e-7, -6.02E+23, 1E5, 100.0]
+DOC = json.dumps({"a": 1.25, "b": NUMBERS, "c": {"x": -3.5e2, "y": [True, None, 4.0]}, "d": 7e1})
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 65))
+def test_numbers_round_trip_at_every_chunk_size(chunk_size):
+    items = list(iter_top_level(io.StringIO(DOC), stream_keys=("b",), chunk_size=chunk_size))
+    expected = json.loads(DOC)
+    assert [value for key, value in items if key == "b"] == NUMBERS
+    assert dict((key, value) for key, value in items if key != "b") == {
+        key: value for key, value in expected.items() if key != "b"
+    }
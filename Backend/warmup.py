@@ -0,0 +1,97 @@
+"""
+Start-up warm-up for the CAPcoach backend.
+
+Loads the read-only state that requests would otherwise build on first use:
+
+* prompt templates and the token counter (tiktoken's encoder when installed)
+* the keyword lexicons of the emotion and pattern analyzers
+* the video service and, when installed, MoviePy (slow to import)
+* the financial data: history index, statement store, per-user spending
+  profiles and the fitted baseline forecasts (auto-ARIMA, seconds per user)
+
+Under gunicorn with `preload_app` (see gunicorn.conf.py), wsgi.py calls
+`warm_up()` in the master before any worker is forked and before the socket
+accepts traffic. The workers then share these pages copy-on-write. At the end
+the surviving objects are moved out of the cyclic GC's view (`gc.freeze()`), so
+collections in the workers don't touch, and therefore copy, the shared pages.
+
+Nothing here calls Groq: network clients must be created after the fork.
+
+Environment:
+    CAPCOACH_WARMUP            0 disables the warm-up
+    CAPCOACH_WARMUP_FORECASTS  0 skips the forecast fits (faster start, slow first /savings-target)
+"""
+
+import gc
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_TEXT = "I'm worried about rent and I keep putting off checking my account."
+
+
+# ---------------------------------------------------------
+def warm_prompts():
+    from ai.utils.context_builder import count_tokens
+    from ai.utils.prompt_utils import PROMPTS
+    for template in PROMPTS.values():
+        count_tokens(template.system)
+
+
+def warm_lexicons():
+    from ai.services.emotional_intelligence_service import EmotionalIntelligenceService
+    from ai.services.pattern_detection_service import PatternDetectionService
+    EmotionalIntelligenceService().analyze_emotional_content(SAMPLE_TEXT)
+    PatternDetectionService().detect_patterns(SAMPLE_TEXT)
+
+
+def warm_video():
+    from ai.video_generation_service import MOVIEPY_AVAILABLE, VideoGenerationService
+    VideoGenerationService()._build_enhanced_script("avoidance", "User", None)
+    if MOVIEPY_AVAILABLE:
+        import moviepy  # noqa: F401
+
+
+def warm_financial_data(forecasts: bool = True):
+    from backend import baseline_forecast, history_files
+    from savings_target import spending_profile
+    from statement_store import default_store
+
+    default_store()
+    for user_id in history_files():
+        spending_profile(user_id)
+        if forecasts:
+            baseline_forecast(user_id)
+
+
+# ---------------------------------------------------------
+def warm_up(forecasts: bool = None, freeze: bool = True) -> dict:
+    """
+    Run every warm-up step and return their durations in seconds. A failing
+    step is logged and skipped; the app then builds that state on first use.
+    """
+    if forecasts is None:
+        forecasts = os.getenv("CAPCOACH_WARMUP_FORECASTS", "1") != "0"
+    steps = [
+        ("prompts", warm_prompts),
+        ("lexicons", warm_lexicons),
+        ("video", warm_video),
+        ("financial_data", lambda: warm_financial_data(forecasts)),
+    ]
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step failed", extra={"step": name})
+            continue
+        timings[name] = round(time.perf_counter() - started, 3)
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    logger.info("Warm-up complete", extra={"seconds": timings, "forecasts": forecasts})
+    return timings
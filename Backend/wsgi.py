@@ -0,0 +1,19 @@
+"""
+WSGI entry point for production servers.
+
+    cd Backend && gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module builds the Flask app (api.py) and runs the warm-up
+(warmup.py). With gunicorn's `preload_app` that happens once in the master,
+before workers are forked and before traffic is accepted.
+"""
+
+import os
+
+from api import app
+import warmup
+
+if os.getenv("CAPCOACH_WARMUP", "1") != "0":
+    warmup.warm_up()
+
+__all__ = ["app"]
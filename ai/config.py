@@ -3,7 +3,7 @@ ai/config.py - Secure configuration with environment variables
 """
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 # ---------------------------------------------------------
@@ -16,6 +16,25 @@ AI_MODE = os.getenv("AI_MODE", "hybrid")
 
 
 
+def _rate_limits_from_env():
+    """
+    GROQ_RATE_LIMITS="model=rpm:tpm,...", with "*" for every other model.
+    Returns (limits, default) or (None, None) when unset.
+    """
+    spec = os.getenv("GROQ_RATE_LIMITS", "").strip()
+    if not spec:
+        return None, None
+    limits = {}
+    for entry in spec.split(","):
+        model, _, values = entry.strip().rpartition("=")
+        rpm, _, tpm = values.partition(":")
+        limits[model or "*"] = (int(rpm), int(tpm))
+    return limits, limits.pop("*", None)
+
+
+_ENV_RATE_LIMITS, _ENV_DEFAULT_RATE_LIMIT = _rate_limits_from_env()
+
+
 # ---------------------------------------------------------
 # 🤖 2. Model Configuration - UPDATED WITH CURRENT PRODUCTION MODELS
 # ---------------------------------------------------------
@@ -31,6 +50,30 @@ class ModelConfig:
     groq_chat_model: str = "llama-3.1-8b-instant"
     groq_diagnosis_model: str = "llama-3.3-70b-versatile"
     groq_temperature: float = 0.7
+    # Ask for response_format=json_object on structured calls (disabled automatically if unsupported)
+    groq_json_mode: bool = os.getenv("GROQ_JSON_MODE", "1") != "0"
+    
+    # Resilience: overall deadline per call (retries included), retry budget,
+    # hedged second request after the observed p95, and circuit breaker settings
+    groq_deadline_seconds: float = float(os.getenv("GROQ_DEADLINE_SECONDS", "10"))
+    groq_max_retries: int = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+    groq_hedge: bool = os.getenv("GROQ_HEDGE", "0") == "1"
+    groq_breaker_failures: int = 5
+    groq_breaker_reset_seconds: float = 30.0
+    
+    # Client-side rate limits per model as (requests/min, tokens/min); match your Groq plan
+    # (or override with GROQ_RATE_LIMITS, e.g. for a local stub server)
+    groq_rate_limits: dict = field(default_factory=lambda: dict(_ENV_RATE_LIMITS) if _ENV_RATE_LIMITS is not None else {
+        "llama-3.1-8b-instant": (30, 6000),
+        "llama-3.3-70b-versatile": (30, 12000),
+    })
+    groq_default_rate_limit: tuple = _ENV_DEFAULT_RATE_LIMIT or (30, 6000)
+    
+    # Micro-batching for /analyze-emotions: texts arriving within the window share one completion.
+    # Off by default: it puts different users' texts in one prompt and adds up to the wait window
+    emotion_batching: bool = os.getenv("EMOTION_BATCHING", "0") == "1"
+    emotion_batch_size: int = int(os.getenv("EMOTION_BATCH_SIZE", "8"))
+    emotion_batch_wait_ms: float = float(os.getenv("EMOTION_BATCH_WAIT_MS", "5"))
     
     # Local fallback
     local_model_path: str = "models/local/llama-3-8b"
@@ -38,6 +81,15 @@ class ModelConfig:
     # Safety limits
     max_tokens_conversation: int = 800
     max_tokens_diagnosis: int = 1500
+    
+    # Conversation prompt window: history is packed newest-first up to this many prompt tokens
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+    context_max_turns: int = 20
+    
+    # Rolling summaries: every N turns, fold all but the most recent into a short summary
+    summary_every_turns: int = int(os.getenv("SUMMARY_EVERY_TURNS", "6"))
+    summary_keep_recent: int = 6
+    summary_max_tokens: int = 200
 
 config = ModelConfig()
 
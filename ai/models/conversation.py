@@ -9,7 +9,7 @@ emotional analysis results, and pattern detection results.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
 # Import emotion and pattern models
@@ -88,6 +88,11 @@ class ConversationContext(BaseModel):
         
     session_patterns : Optional[SessionPatterns]
         Structured pattern detection at session level
+        
+    summary_state : Tuple[Optional[str], int]
+        `(running_summary, summarized_turns)`: the compressed summary and how
+        many turns, from the start, it covers. Replaced as one tuple so readers
+        never pair a new summary with an old turn count (or the reverse).
     """
     
     session_id: str = Field(..., description="Unique session identifier")
@@ -108,6 +113,19 @@ class ConversationContext(BaseModel):
         None,
         description="Structured session-level pattern detection"
     )
+    summary_state: Tuple[Optional[str], int] = Field(
+        (None, 0),
+        description="Rolling summary of older turns and how many leading turns it covers, "
+                    "maintained by ConversationSummarizer"
+    )
+
+    @property
+    def running_summary(self) -> Optional[str]:
+        return self.summary_state[0]
+
+    @property
+    def summarized_turns(self) -> int:
+        return self.summary_state[1]
 
     def add_turn(self, turn: ConversationTurn) -> None:
         """
@@ -288,6 +306,24 @@ class ConversationContext(BaseModel):
         # Return the last n turns (or all turns if fewer than n exist)
         return self.turns[-n:]
 
+    def get_unsummarized_turns(self, n: Optional[int] = None) -> List[ConversationTurn]:
+        """
+        Get the turns not yet covered by `running_summary` (the last n of them).
+        """
+        return self.get_summary_context(n)[1]
+
+    def get_summary_context(self, n: Optional[int] = None) -> Tuple[Optional[str], List[ConversationTurn]]:
+        """
+        Get the running summary and the turns it doesn't cover yet (the last n
+        of them), both from the same summary update.
+        
+        Prompts pair the two, so nothing is sent twice and older context is
+        still represented even while a background summary is being published.
+        """
+        summary, summarized = self.summary_state
+        turns = self.turns[summarized:]
+        return summary, (turns[-n:] if n else turns)
+
     def get_conversation_length(self) -> int:
         """
         Get the total number of turns in the conversation.
@@ -357,3 +393,4 @@ class ConversationContext(BaseModel):
         self.detected_patterns_summary = None
         self.session_emotions = None
         self.session_patterns = None
+        self.summary_state = (None, 0)
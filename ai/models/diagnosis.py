@@ -51,10 +51,4 @@ class DiagnosisSummary(BaseModel):
         """
         Updates the dominant disorder in the disorder_insights.
         """
-        return self.disorder_insights.calculate_dominant_disorder()
-
-print("File Ran!")
-
-print("File Ran!")
-
-print("File Ran!")
\ No newline at end of file
+        return self.disorder_insights.calculate_dominant_disorder()
\ No newline at end of file
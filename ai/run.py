@@ -253,5 +253,8 @@ async def main():
     await app.run()
 
 if __name__ == "__main__":
+    # Service logs as plain text lines, written off the chat loop's thread
+    from ai.utils.logging_config import configure_logging
+    configure_logging(fmt="text")
     # Run the application
     asyncio.run(main())
\ No newline at end of file
@@ -2,22 +2,25 @@
 CAPcoach AI Services
 """
 
+from importlib.util import find_spec
+
 from .emotional_intelligence_service import EmotionalIntelligenceService
 from .pattern_detection_service import PatternDetectionService
 from .conversational_diagnosis_service import ConversationalDiagnosisService
+from .insights_service import SessionInsightsService
 
-# Conditionally import Groq services if available
-try:
+# Conditionally import Groq services if available.
+# The Groq services import openai lazily, so check for the package up front.
+GROQ_AVAILABLE = find_spec("openai") is not None
+if GROQ_AVAILABLE:
     from .groq_emotional_service import GroqEmotionalIntelligenceService
     from .groq_conversation_service import GroqConversationalDiagnosisService
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
 
 __all__ = [
     'EmotionalIntelligenceService',
     'PatternDetectionService', 
-    'ConversationalDiagnosisService'
+    'ConversationalDiagnosisService',
+    'SessionInsightsService'
 ]
 
 if GROQ_AVAILABLE:
@@ -5,6 +5,7 @@ from ai.services.emotional_intelligence_service import EmotionalIntelligenceServ
 from ai.services.pattern_detection_service import PatternDetectionService
 from ai.state.conversation_state_manager import ConversationStateManager
 from ai.models.conversation import ConversationTurn
+from ai.utils.tracing import traced
 
 class ConversationalDiagnosisService:
     """
@@ -29,6 +30,7 @@ class ConversationalDiagnosisService:
             "first_question": first_question
         }
 
+    @traced("chat.process_user_response", service="local")
     async def process_user_response(self, session_id: str, user_message: str) -> Dict:
         # Step 1: Analyze emotion
         emotional_data = self.emotion_service.analyze_emotional_content(user_message)
@@ -0,0 +1,100 @@
+# emotion_batcher.py
+"""
+Micro-batching in front of GroqEmotionalIntelligenceService.
+
+Concurrent /analyze-emotions requests that arrive within `max_wait_ms` of each
+other (up to `max_batch` texts) are scored with one multi-text completion, and
+each caller gets back its own result. Under load this turns N completions into
+roughly N / max_batch, which saves rate-limit budget and upstream concurrency.
+The cost is at most `max_wait_ms` of extra latency for the first request of a
+batch. Off unless EMOTION_BATCHING=1, since a batch puts different users'
+texts in one prompt.
+
+A batch runs in the context (trace, correlation ids) of its first request.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from ai.config import config
+
+
+class EmotionBatcher:
+    """
+    Parameters:
+    -----------
+    service : GroqEmotionalIntelligenceService
+        Anything with `analyze_batch(texts) -> list of dicts`
+    max_batch : int
+        Most texts per completion
+    max_wait_ms : float
+        How long the first request of a batch waits for company
+    max_in_flight : int
+        Batches sent to the upstream concurrently
+    """
+
+    def __init__(self, service, max_batch: int = None, max_wait_ms: float = None, max_in_flight: int = 4):
+        self.service = service
+        self.max_batch = max_batch or config.emotion_batch_size
+        self.max_wait = (config.emotion_batch_wait_ms if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._pending: List[Tuple[str, Future, contextvars.Context]] = []
+        self._cond = threading.Condition()
+        self._workers = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="emotion-batch")
+        self.stats: Dict[str, int] = {"texts": 0, "batches": 0}
+        self._dispatcher = None
+
+    # ---------------------------------------------------------
+    def submit(self, text: str) -> Future:
+        """Queue `text` for the next batch; the Future resolves to its score dict."""
+        future = Future()
+        with self._cond:
+            # Started on first use, and again in a forked worker (threads don't survive fork)
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch, name="emotion-batcher", daemon=True)
+                self._dispatcher.start()
+            self._pending.append((text, future, contextvars.copy_context()))
+            self._cond.notify()
+        return future
+
+    def analyze_emotional_content(self, text: str) -> dict:
+        """Same call as the wrapped service, but batched with concurrent callers."""
+        return self.submit(text).result()
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.stats["texts"] / self.stats["batches"] if self.stats["batches"] else 0.0
+
+    # ---------------------------------------------------------
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # The window opens with the first queued request
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            self.stats["texts"] += len(batch)
+            self.stats["batches"] += 1
+            # Spans and log lines of the upstream call belong to the request that opened the batch
+            context = batch[0][2]
+            self._workers.submit(context.run, self._run, batch)
+
+    def _run(self, batch: List[Tuple[str, Future, contextvars.Context]]):
+        texts = [text for text, _, _ in batch]
+        try:
+            results = self.service.analyze_batch(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
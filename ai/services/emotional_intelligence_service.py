@@ -1,6 +1,9 @@
 # emotional_intelligence_service.py
 from typing import Dict
 
+from ai.utils.metrics import ANALYZER_SECONDS, timed
+from ai.utils.tracing import traced
+
 class EmotionalIntelligenceService:
     """
     Analyzes textual input and returns structured emotional data.
@@ -16,6 +19,8 @@ class EmotionalIntelligenceService:
             "angry": ["angry", "mad", "frustrated", "upset"]
         }
 
+    @traced("analysis.emotions", analyzer="keyword")
+    @timed(ANALYZER_SECONDS, analyzer="keyword_emotions")
     def analyze_emotional_content(self, text: str) -> Dict[str, float]:
         text_lower = text.lower()
         scores = {emotion: 0.0 for emotion in self.emotion_keywords}
@@ -1,10 +1,18 @@
 # ai/services/groq_conversation_service.py
-import os
 import asyncio
-from openai import OpenAI
+import logging
 from ai.config import config, select_model
 from ai.state.conversation_state_manager import ConversationStateManager
 from ai.models.conversation import ConversationTurn
+from ai.utils.context_builder import build_conversation_prompt
+from ai.utils.prompt_utils import GREETING
+from ai.services.summarization_service import ConversationSummarizer
+from ai.services.resilience import CircuitOpenError, shared_groq_client
+from ai.services.rate_limiter import INTERACTIVE
+from ai.utils.metrics import FALLBACKS
+from ai.utils.tracing import current_span, span, traced
+
+logger = logging.getLogger(__name__)
 
 class GroqConversationalDiagnosisService:
     """
@@ -12,13 +20,36 @@ class GroqConversationalDiagnosisService:
     """
     
     def __init__(self):
-        self.client = OpenAI(
-            api_key=os.getenv("GROQ_API_KEY"),
-            base_url=os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
-        )
+        self._client = None
         self.state_manager = ConversationStateManager()
         self.emotion_service = None
         self.pattern_service = None
+        self._local_service = None
+        # Older turns are folded into a running summary in the background
+        self.summarizer = ConversationSummarizer(client_factory=lambda: self.client)
+    
+    @property
+    def client(self):
+        """
+        Shared Groq client with deadlines, retries and a circuit breaker
+        (the OpenAI client itself is created on first use; importing openai is slow)
+        """
+        if self._client is None:
+            self._client = shared_groq_client()
+        return self._client
+    
+    def _groq_unavailable(self) -> bool:
+        """True while the circuit breaker is open, so calls would fail immediately."""
+        return getattr(self.client, "circuit_open", False)
+    
+    @property
+    def local_service(self):
+        """Local diagnosis service sharing this service's sessions, used as the fallback"""
+        if self._local_service is None:
+            from ai.services.conversational_diagnosis_service import ConversationalDiagnosisService
+            self._local_service = ConversationalDiagnosisService()
+            self._local_service.state_manager = self.state_manager
+        return self._local_service
     
     def initiate_diagnostic_conversation(self, user_context: dict) -> dict:
         """Start a new diagnostic session"""
@@ -26,25 +57,20 @@ class GroqConversationalDiagnosisService:
         session_id = str(uuid.uuid4())
         
         # Use Groq for the initial greeting if configured
-        if select_model("conversation") == "groq":
+        if select_model("conversation") == "groq" and not self._groq_unavailable():
             try:
-                prompt = f"""
-                Create a warm, empathetic greeting for a financial coaching session.
-                User: {user_context.get('name', 'User')}
-                Context: Starting financial wellness conversation
-                
-                Return a friendly greeting that introduces you as CAPcoach and invites them to share about their financial habits.
-                """
-                
                 response = self.client.chat.completions.create(
                     model=config.groq_chat_model,
-                    messages=[{"role": "user", "content": prompt}],
+                    messages=GREETING.messages(name=user_context.get('name', 'User')),
                     temperature=0.7,
-                    max_tokens=100
+                    max_tokens=100,
+                    priority=INTERACTIVE
                 )
                 welcome_message = response.choices[0].message.content
                 first_question = "How would you describe your current relationship with money?"
-            except:
+            except Exception as e:
+                FALLBACKS.inc(service="groq_greeting", reason="api_error")
+                logger.warning("Groq greeting failed, using the default welcome", extra={"error": str(e)})
                 welcome_message = "Hi! I'm CAPcoach. Let's explore your financial habits together."
                 first_question = "How would you describe your current relationship with money?"
         else:
@@ -59,20 +85,24 @@ class GroqConversationalDiagnosisService:
             "first_question": first_question
         }
     
+    @traced("chat.process_user_response", service="groq")
     async def process_user_response(self, session_id: str, user_message: str) -> dict:
         """
         Use Groq to generate empathetic, context-aware responses
         """
-        # Fallback to local implementation if Groq not selected
-        if select_model("conversation") != "groq":
-            from ai.services.conversational_diagnosis_service import ConversationalDiagnosisService
-            local_service = ConversationalDiagnosisService()
-            return await local_service.process_user_response(session_id, user_message)
+        # Local implementation if Groq isn't selected, or straight away while the breaker is open
+        if select_model("conversation") != "groq" or self._groq_unavailable():
+            reason = "not_selected"
+            if select_model("conversation") == "groq":
+                FALLBACKS.inc(service="groq_conversation", reason="circuit_open")
+                reason = "circuit_open"
+            with span("chat.local_fallback", reason=reason):
+                return await self.local_service.process_user_response(session_id, user_message)
         
         try:
-            # Get conversation history for context
-            recent_turns = self.state_manager.get_recent_turns(session_id, 5)
-            context = "\n".join([f"{turn.speaker}: {turn.text}" for turn in recent_turns])
+            # Running summary of older turns plus the turns it doesn't cover yet
+            session = self.state_manager.sessions.get(session_id)
+            summary, recent_turns = session.get_summary_context(config.context_max_turns) if session else (None, [])
             
             # Initialize emotion and pattern services if needed
             if not self.emotion_service:
@@ -86,33 +116,22 @@ class GroqConversationalDiagnosisService:
             emotions = self.emotion_service.analyze_emotional_content(user_message)
             patterns = self.pattern_service.detect_patterns(user_message)
             
-            prompt = f"""
-            You are CAPcoach, a compassionate financial therapist AI. You're having a conversation about money habits and financial wellness.
-            
-            Recent conversation context:
-            {context}
-            
-            User's latest message: "{user_message}"
-            
-            Detected emotions: {emotions}
-            Detected financial patterns: {patterns}
-            
-            Your role:
-            - Show deep empathy and understanding of financial emotions
-            - Ask insightful, gentle questions to uncover financial patterns
-            - Provide supportive guidance, not direct financial advice
-            - Help users understand their relationship with money
-            - Keep responses conversational, warm, and encouraging
-            - Validate their feelings and experiences
-            
-            Respond naturally and continue the conversation in a supportive way.
-            """
+            # Pack as many recent turns as fit the token budget, oldest dropped first
+            with span("prompt.build", candidate_turns=len(recent_turns)) as prompt_span:
+                prompt = build_conversation_prompt(
+                    recent_turns, user_message, emotions, patterns,
+                    token_budget=config.context_token_budget,
+                    summary=summary
+                )
+                prompt_span.set_attribute("prompt_tokens", prompt.prompt_tokens)
+                prompt_span.set_attribute("context_turns", prompt.turns_included)
             
             response = self.client.chat.completions.create(
                 model=config.groq_chat_model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=prompt.messages,
                 temperature=0.7,
-                max_tokens=300
+                max_tokens=300,
+                priority=INTERACTIVE
             )
             
             ai_response = response.choices[0].message.content
@@ -128,17 +147,24 @@ class GroqConversationalDiagnosisService:
                 speaker="ai", 
                 text=ai_response
             ))
+            self.summarizer.maybe_schedule(self.state_manager.sessions[session_id])
             
             return {
                 "ai_response": ai_response,
                 "diagnostic_insights": patterns,
                 "next_question_type": "follow_up",
-                "conversation_progress": self.state_manager.track_diagnostic_progress(session_id)
+                "conversation_progress": self.state_manager.track_diagnostic_progress(session_id),
+                "prompt_tokens": prompt.prompt_tokens,
+                "context_turns": prompt.turns_included
             }
             
         except Exception as e:
-            print(f"❌ Groq conversation failed: {e}")
+            # The breaker can open (or start its probe) between the check above and the call
+            reason = "circuit_open" if isinstance(e, CircuitOpenError) else "api_error"
+            FALLBACKS.inc(service="groq_conversation", reason=reason)
+            logger.error("Groq conversation failed, using the local service",
+                         extra={"session_id": session_id, "error": str(e), "reason": reason})
+            current_span().record_exception(e)
             # Fallback to local implementation
-            from ai.services.conversational_diagnosis_service import ConversationalDiagnosisService
-            local_service = ConversationalDiagnosisService()
-            return await local_service.process_user_response(session_id, user_message)
\ No newline at end of file
+            with span("chat.local_fallback", reason=reason):
+                return await self.local_service.process_user_response(session_id, user_message)
\ No newline at end of file
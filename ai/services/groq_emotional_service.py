@@ -1,8 +1,58 @@
 # ai/services/groq_emotional_service.py
-import os
 import json
-from openai import OpenAI
+import logging
+import threading
 from ai.config import config, select_model
+from ai.utils.prompt_utils import EMOTION_ANALYSIS, EMOTION_BATCH, EMOTION_VOCABULARY
+from ai.utils.json_extract import extract_json_object
+from ai.services.resilience import CircuitOpenError, shared_groq_client
+from ai.utils.metrics import ANALYZER_SECONDS, FALLBACKS, timed
+from ai.utils.tracing import current_span, traced
+
+logger = logging.getLogger(__name__)
+
+# Labels models commonly use instead of the vocabulary words
+EMOTION_ALIASES = {
+    "anxiety": "anxious", "worried": "anxious", "nervous": "anxious",
+    "happiness": "happy", "joy": "happy",
+    "sadness": "sad", "anger": "angry", "frustrated": "angry", "frustration": "angry",
+    "fear": "fearful", "scared": "fearful", "afraid": "fearful",
+    "overwhelm": "overwhelmed", "confidence": "confident", "hope": "hopeful",
+    "stress": "stressed", "calmness": "calm", "relaxed": "calm",
+}
+
+
+def normalize_emotions(raw: dict) -> dict:
+    """
+    Map a model's emotion dict onto EMOTION_VOCABULARY: aliases are folded in,
+    unknown labels and non-numeric scores dropped, scores clamped to [0, 1].
+    A reply that is clearly on a 0-100 scale is rescaled first. Every vocabulary
+    emotion is present in the result.
+    """
+    # Some models nest the scores, e.g. {"emotions": {...}}
+    if len(raw) == 1:
+        (only,) = raw.values()
+        if isinstance(only, dict):
+            raw = only
+
+    parsed = []
+    for label, value in raw.items():
+        name = str(label).strip().lower()
+        name = EMOTION_ALIASES.get(name, name)
+        if name not in EMOTION_VOCABULARY:
+            continue
+        try:
+            score = float(value)
+        except (TypeError, ValueError):
+            continue
+        if score == score:      # skip NaN
+            parsed.append((name, score))
+
+    scale = 100.0 if parsed and 10.0 <= max(s for _, s in parsed) <= 100.0 else 1.0
+    scores = dict.fromkeys(EMOTION_VOCABULARY, 0.0)
+    for name, score in parsed:
+        scores[name] = max(scores[name], min(max(score / scale, 0.0), 1.0))
+    return scores
 
 class GroqEmotionalIntelligenceService:
     """
@@ -10,51 +60,160 @@ class GroqEmotionalIntelligenceService:
     """
     
     def __init__(self):
-        self.client = OpenAI(
-            api_key=os.getenv("GROQ_API_KEY"),
-            base_url=os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+        self._client = None
+        self._json_mode = config.groq_json_mode
+        # Parse-failure metric: LLM replies we couldn't turn into scores
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "parse_failures": 0, "api_errors": 0}
+    
+    @property
+    def client(self):
+        """
+        Shared Groq client with deadlines, retries and a circuit breaker
+        (the OpenAI client itself is created on first use; importing openai is slow)
+        """
+        if self._client is None:
+            self._client = shared_groq_client()
+        return self._client
+    
+    def _groq_unavailable(self) -> bool:
+        """True while the circuit breaker is open, so calls would fail immediately."""
+        return getattr(self.client, "circuit_open", False)
+    
+    @property
+    def parse_failure_rate(self) -> float:
+        """Share of completed LLM calls whose reply couldn't be parsed."""
+        with self._stats_lock:
+            return self.stats["parse_failures"] / self.stats["requests"] if self.stats["requests"] else 0.0
+    
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def _complete(self, messages: list, max_tokens: int = 200):
+        """Chat completion in JSON mode when the backend supports it."""
+        kwargs = dict(
+            model=config.groq_chat_model,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=max_tokens
         )
+        if self._json_mode:
+            try:
+                return self.client.chat.completions.create(response_format={"type": "json_object"}, **kwargs)
+            except Exception as e:
+                # Older OpenAI-compatible servers reject the parameter; stop sending it
+                if "response_format" not in str(e):
+                    raise
+                logger.warning("JSON mode not supported by backend, falling back to plain completions",
+                               extra={"error": str(e)})
+                self._json_mode = False
+        return self.client.chat.completions.create(**kwargs)
     
+    @traced("analysis.emotions", analyzer="groq")
+    @timed(ANALYZER_SECONDS, analyzer="groq_emotions")
     def analyze_emotional_content(self, text: str) -> dict:
         """
         Use Groq to analyze emotions in text with sophisticated understanding
         """
         # Fallback to local implementation if Groq not selected
-        if select_model("emotion_analysis") != "groq":
+        if select_model("emotion_analysis") != "groq" or self._groq_unavailable():
+            if select_model("emotion_analysis") == "groq":
+                FALLBACKS.inc(service="groq_emotions", reason="circuit_open")
+                current_span().set_attribute("fallback", "circuit_open")
             from ai.services.emotional_intelligence_service import EmotionalIntelligenceService
             local_service = EmotionalIntelligenceService()
             return local_service.analyze_emotional_content(text)
         
         try:
-            prompt = f"""
-            Analyze the emotional content of this text about finances and return ONLY a JSON object with emotion scores between 0 and 1:
-            
-            Text: "{text}"
-            
-            Consider these emotions: anxious, happy, sad, angry, fearful, overwhelmed, confident, hopeful, stressed, calm
-            
-            Return format: {{"emotion1": score, "emotion2": score}}
-            Example: {{"anxious": 0.8, "overwhelmed": 0.6, "stressed": 0.7}}
-            
-            Only return the JSON object, nothing else.
-            """
-            
-            response = self.client.chat.completions.create(
-                model=config.groq_chat_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=200
+            # Static instructions go in the system message so the provider can cache the prefix
+            response = self._complete(EMOTION_ANALYSIS.messages(text=text))
+        except Exception as e:
+            reason = "circuit_open" if isinstance(e, CircuitOpenError) else "api_error"
+            if reason == "api_error":
+                self._count("api_errors")
+            FALLBACKS.inc(service="groq_emotions", reason=reason)
+            logger.error("Groq emotion analysis failed", extra={"error": str(e), "reason": reason})
+            current_span().record_exception(e)
+            current_span().set_attribute("fallback", reason)
+            return self._local_fallback(text)
+        
+        # Tolerant parse: fenced, prose-wrapped or truncated JSON all still yield scores
+        self._count("requests")
+        raw = extract_json_object(response.choices[0].message.content)
+        if raw is None:
+            self._count("parse_failures")
+            FALLBACKS.inc(service="groq_emotions", reason="parse_failure")
+            current_span().set_attribute("fallback", "parse_failure")
+            logger.warning("Groq emotion analysis returned no JSON",
+                           extra={"parse_failure_rate": round(self.parse_failure_rate, 4)})
+            return self._local_fallback(text)
+        
+        result = normalize_emotions(raw)
+        logger.debug("Groq emotion analysis", extra={"emotions": result})
+        return result
+    
+    @traced("analysis.emotions_batch", analyzer="groq")
+    @timed(ANALYZER_SECONDS, analyzer="groq_emotions_batch")
+    def analyze_batch(self, texts: list) -> list:
+        """
+        Score several texts with a single completion (used by EmotionBatcher).
+        Returns one score dict per text, in order. Texts are sent with ids and
+        results are matched back by id, never by position; any text the reply
+        doesn't cover (missing, duplicate or unknown ids) falls back to the
+        local analyzer and counts as a parse failure.
+        """
+        if len(texts) == 1:
+            return [self.analyze_emotional_content(texts[0])]
+        if select_model("emotion_analysis") != "groq" or self._groq_unavailable():
+            if select_model("emotion_analysis") == "groq":
+                FALLBACKS.inc(len(texts), service="groq_emotions", reason="circuit_open")
+            return [self._local_fallback(text) for text in texts]
+        
+        try:
+            response = self._complete(
+                EMOTION_BATCH.messages(texts_json=json.dumps(
+                    {"texts": [{"id": i, "text": text} for i, text in enumerate(texts)]}, ensure_ascii=False)),
+                max_tokens=min(120 * len(texts), 2000)
             )
-            
-            # Parse the JSON response
-            result_text = response.choices[0].message.content.strip()
-            result = json.loads(result_text)
-            print(f"🎭 Groq Emotion Analysis: {result}")
-            return result
-            
         except Exception as e:
-            print(f"❌ Groq emotion analysis failed: {e}")
-            # Fallback to local implementation
-            from ai.services.emotional_intelligence_service import EmotionalIntelligenceService
-            local_service = EmotionalIntelligenceService()
-            return local_service.analyze_emotional_content(text)
\ No newline at end of file
+            reason = "circuit_open" if isinstance(e, CircuitOpenError) else "api_error"
+            if reason == "api_error":
+                self._count("api_errors")
+            FALLBACKS.inc(len(texts), service="groq_emotions", reason=reason)
+            logger.error("Groq batch emotion analysis failed", extra={"error": str(e), "batch_size": len(texts)})
+            return [self._local_fallback(text) for text in texts]
+        
+        self._count("requests")
+        raw = extract_json_object(response.choices[0].message.content)
+        items = raw.get("results") if isinstance(raw, dict) else None
+        if not isinstance(items, list):
+            self._count("parse_failures")
+            FALLBACKS.inc(len(texts), service="groq_emotions", reason="parse_failure")
+            logger.warning("Groq batch emotion analysis returned no results",
+                           extra={"parse_failure_rate": round(self.parse_failure_rate, 4), "batch_size": len(texts)})
+            return [self._local_fallback(text) for text in texts]
+        
+        by_id = {}
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("emotions"), dict):
+                continue
+            item_id = item.get("id")
+            if isinstance(item_id, int) and 0 <= item_id < len(texts) and item_id not in by_id:
+                by_id[item_id] = normalize_emotions(item["emotions"])
+        
+        unmatched = len(texts) - len(by_id)
+        if unmatched:
+            self._count("parse_failures")
+            FALLBACKS.inc(unmatched, service="groq_emotions", reason="parse_failure")
+            current_span().set_attribute("unmatched", unmatched)
+            logger.warning("Groq batch emotion analysis left texts unmatched",
+                           extra={"unmatched": unmatched, "batch_size": len(texts)})
+        results = [by_id[i] if i in by_id else self._local_fallback(text) for i, text in enumerate(texts)]
+        logger.debug("Groq batch emotion analysis", extra={"batch_size": len(texts)})
+        return results
+    
+    def _local_fallback(self, text: str) -> dict:
+        from ai.services.emotional_intelligence_service import EmotionalIntelligenceService
+        local_service = EmotionalIntelligenceService()
+        return local_service.analyze_emotional_content(text)
\ No newline at end of file
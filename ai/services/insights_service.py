@@ -0,0 +1,201 @@
+# insights_service.py
+"""
+Builds end-of-session insights from the stored ConversationContext.
+
+The frontend polls /session/<id>/insights, so results are memoized per
+`cache_key` (session, turn count, summary and analysis progress): polling is a
+dictionary lookup until a new turn arrives or the running summary moves on, and
+the diagnosis is only rebuilt when the conversation has changed.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ai.models.conversation import ConversationContext
+from ai.models.diagnosis import DiagnosisSummary, DisorderInsights
+from ai.utils.metrics import CACHE_REQUESTS
+
+_CACHE_HITS = CACHE_REQUESTS.labels(cache="session_insights", result="hit")
+_CACHE_MISSES = CACHE_REQUESTS.labels(cache="session_insights", result="miss")
+
+
+class SessionInsightsService:
+    """
+    Turns a session's emotion and pattern history into a DiagnosisSummary
+    and the insights payload shown by AICoach.jsx.
+    """
+
+    # Emotion labels (local and Groq analyzers) that feed the anxiety score
+    ANXIETY_TONES = ("anxious", "anxiety", "fear", "worried", "stress")
+
+    STRATEGIES = {
+        "anxiety": [
+            "Check your balance at a set time each week instead of whenever worry hits",
+            "Build a small emergency buffer first",
+            "Write down the worst case and the plan for it",
+        ],
+        "avoidance": [
+            "Start small: open one statement a week",
+            "Automate savings and bill payments",
+            "Pair money tasks with something you enjoy",
+        ],
+        "impulsivity": [
+            "Wait 24 hours before non-essential purchases",
+            "Set a weekly fun-money allowance",
+            "Remove saved cards from shopping apps",
+        ],
+        "money_dyslexia": [
+            "Use one simple budget with three categories",
+            "Set reminders for due dates",
+            "Review one account at a time",
+        ],
+    }
+
+    ADVICE = {
+        "anxiety": "Your worry about money is valid. Small, predictable check-ins will make it feel more manageable.",
+        "avoidance": "Focus on consistent small habits so looking at your finances stops feeling like a big event.",
+        "impulsivity": "Adding a pause between the urge and the purchase will protect your goals without banning fun.",
+        "money_dyslexia": "Simplifying how your money is organized will make it easier to stay on top of.",
+    }
+
+    def __init__(self, state_manager, max_cached: int = 256):
+        """
+        Parameters:
+        -----------
+        state_manager : ConversationStateManager
+            Where the sessions live (shared with the conversation service)
+        max_cached : int
+            Number of results (one per cache_key) to keep
+        """
+        self.state_manager = state_manager
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---------------------------------------------------------
+    def get_insights(self, session_id: str) -> Optional[Dict]:
+        """
+        Insights for a session, or None if the session doesn't exist.
+        Cached until the session's turn count or running summary changes.
+        """
+        context = self.state_manager.sessions.get(session_id)
+        if context is None:
+            return None
+
+        key = self.cache_key(context)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        if cached is not None:
+            _CACHE_HITS.inc()
+            return cached
+
+        _CACHE_MISSES.inc()
+        # Built outside the lock; two concurrent misses for one key just both build it
+        insights = self.build_insights(context)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = insights
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return insights
+
+    @staticmethod
+    def cache_key(context: ConversationContext) -> tuple:
+        """
+        What the insights depend on: the session, its turn count, how far the
+        summary reaches and how many messages the emotion and pattern summaries
+        hold. add_turn appends the turn before it updates those summaries, so the
+        turn count alone would let a payload built in between be cached (and used
+        as the ETag) as if it were final. The payload is built after the key is
+        read, so it is never older than its key.
+        """
+        emotions = context.session_emotions
+        patterns = context.session_patterns
+        return (context.session_id, len(context.turns), context.summarized_turns,
+                len(emotions.message_emotions) if emotions else 0,
+                len(patterns.message_patterns) if patterns else 0)
+
+    # ---------------------------------------------------------
+    @staticmethod
+    def _average_emotions(context: ConversationContext) -> Dict[str, float]:
+        """Mean intensity per emotion over the messages that carried emotions."""
+        if not context.session_emotions or not context.session_emotions.message_emotions:
+            return {}
+        messages = context.session_emotions.message_emotions
+        totals: Dict[str, float] = {}
+        for message in messages:
+            for emotion in message.emotions:
+                totals[emotion.tone] = totals.get(emotion.tone, 0.0) + emotion.intensity
+        return {tone: total / len(messages) for tone, total in totals.items()}
+
+    @staticmethod
+    def _average_patterns(context: ConversationContext) -> Dict[str, float]:
+        """Mean score per pattern over the messages that carried patterns."""
+        if not context.session_patterns or not context.session_patterns.message_patterns:
+            return {}
+        count = len(context.session_patterns.message_patterns)
+        return {kind: total / count for kind, total in context.session_patterns.aggregate_scores().items()}
+
+    def build_summary(self, context: ConversationContext) -> DiagnosisSummary:
+        """Score the four disorders from the session averages."""
+        emotions = self._average_emotions(context)
+        patterns = self._average_patterns(context)
+
+        insights = DisorderInsights(
+            avoidance_score=round(patterns.get("avoidance", 0.0), 3),
+            impulsivity_score=round(patterns.get("impulsivity", 0.0), 3),
+            anxiety_score=round(max((emotions.get(t, 0.0) for t in self.ANXIETY_TONES), default=0.0), 3),
+            money_dyslexia_score=round(patterns.get("money_dyslexia", 0.0), 3),
+        )
+        # Leave dominant_disorder unset until the conversation shows some signal
+        if any((insights.avoidance_score, insights.impulsivity_score,
+                insights.anxiety_score, insights.money_dyslexia_score)):
+            insights.calculate_dominant_disorder()
+
+        summary = DiagnosisSummary(
+            session_id=context.session_id,
+            disorder_insights=insights,
+            pattern_observations={k: round(v, 3) for k, v in patterns.items()},
+            emotional_trends={k: round(v, 3) for k, v in emotions.items()},
+        )
+        if context.turns:
+            summary.timestamp = context.turns[-1].timestamp
+        summary.suggested_actions = self.STRATEGIES.get(insights.dominant_disorder, [])
+        return summary
+
+    def build_insights(self, context: ConversationContext) -> Dict:
+        """The /insights payload: the summary plus the fields AICoach.jsx renders."""
+        summary = self.build_summary(context)
+        insights = summary.disorder_insights
+        scores = {
+            "anxiety": insights.anxiety_score,
+            "avoidance": insights.avoidance_score,
+            "impulsivity": insights.impulsivity_score,
+            "money_dyslexia": insights.money_dyslexia_score,
+        }
+        has_signal = insights.dominant_disorder is not None
+        dominant_emotion = max(summary.emotional_trends.items(), key=lambda x: x[1], default=("neutral", 0.0))
+
+        return {
+            "session_id": context.session_id,
+            "turn_count": len(context.turns),
+            "conversation_summary": context.running_summary,
+            "emotional_patterns": {
+                "dominant_emotion": dominant_emotion[0] if dominant_emotion[1] > 0 else "neutral",
+                "confidence": round(dominant_emotion[1], 3),
+            },
+            "financial_behavior": {
+                "pattern": insights.dominant_disorder if has_signal else "undetermined",
+                "scores": scores,
+                "suggested_strategies": summary.suggested_actions if has_signal else [],
+            },
+            "personalized_advice": self.ADVICE[insights.dominant_disorder] if has_signal
+                else "Tell me a bit more about your money habits so I can tailor my advice.",
+            "diagnosis": summary.model_dump(mode="json"),
+        }
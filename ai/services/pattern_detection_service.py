@@ -1,6 +1,9 @@
 # pattern_detection_service.py
 from typing import Dict
 
+from ai.utils.metrics import ANALYZER_SECONDS, timed
+from ai.utils.tracing import traced
+
 class PatternDetectionService:
     """
     Detects behavioral patterns like avoidance, impulsivity, and money dyslexia.
@@ -14,6 +17,8 @@ class PatternDetectionService:
             "money_dyslexia": ["confused", "mix up", "forget"]
         }
 
+    @traced("analysis.patterns", analyzer="keyword")
+    @timed(ANALYZER_SECONDS, analyzer="keyword_patterns")
     def detect_patterns(self, text: str) -> Dict[str, float]:
         text_lower = text.lower()
         scores = {pattern: 0.0 for pattern in self.pattern_keywords}
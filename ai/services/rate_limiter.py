@@ -0,0 +1,196 @@
+# rate_limiter.py
+"""
+Client-side rate limiting for the Groq API.
+
+One process-wide `RequestScheduler` holds a requests-per-minute and a
+tokens-per-minute token bucket for each model. Callers `acquire()` before sending
+a request. When the buckets are empty they queue instead of getting a 429, and
+queued work is released in priority order (interactive chat before background
+summaries and batch insights) and FIFO within a priority.
+
+Token use is estimated up front from the prompt plus `max_tokens`. `settle()`
+corrects the bucket with the real usage once the response arrives.
+
+`snapshot()` reports queue depth and wait-time metrics per model (served at
+/api/ai/rate-limits); depth, waits and timeouts are also recorded in /metrics.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from ai.config import config
+from ai.utils.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_TIMEOUTS, LLM_QUEUE_WAIT_SECONDS
+
+# Priority classes (lower runs first)
+INTERACTIVE = 0
+NORMAL = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BATCH: "batch"}
+
+
+class TokenBucket:
+    """Continuously refilling bucket: `per_minute` units per minute, bursting to `capacity`."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it already is)."""
+        self._refill(now)
+        # A request bigger than the whole bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float, now: Optional[float] = None):
+        # Refill for the elapsed time first, or the clamp would swallow returned budget
+        self._refill(time.monotonic() if now is None else now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _ModelQueue:
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waiters = []               # heap of (priority, seq)
+        self.cond = threading.Condition()
+        self.max_depth = 0
+        self.admitted = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.waits = deque(maxlen=500)
+        self.waits_by_priority: Dict[int, float] = {}
+
+
+class RequestScheduler:
+    """
+    Shared RPM/TPM scheduler. Limits come from `config.groq_rate_limits`
+    ({model: (rpm, tpm)}); unknown models use `config.groq_default_rate_limit`.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None, default_limit: Optional[tuple] = None):
+        self.limits = dict(config.groq_rate_limits if limits is None else limits)
+        self.default_limit = default_limit or config.groq_default_rate_limit
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        with self._lock:
+            queue = self._queues.get(model)
+            if queue is None:
+                queue = self._queues[model] = _ModelQueue(model, *self.limits.get(model, self.default_limit))
+            return queue
+
+    # ---------------------------------------------------------
+    def acquire(self, model: str, tokens: int, priority: int = NORMAL, timeout: Optional[float] = None) -> bool:
+        """
+        Block until one request and `tokens` tokens are available for `model`.
+        Returns False if `timeout` seconds pass first (nothing is consumed then).
+        """
+        queue = self._queue(model)
+        entry = (priority, next(self._seq))
+        started = time.monotonic()
+        give_up_at = None if timeout is None else started + timeout
+
+        with queue.cond:
+            heapq.heappush(queue.waiters, entry)
+            queue.max_depth = max(queue.max_depth, len(queue.waiters))
+            LLM_QUEUE_DEPTH.set(len(queue.waiters), model=model)
+            while True:
+                now = time.monotonic()
+                wait = None
+                if queue.waiters[0] == entry:
+                    wait = max(queue.requests.wait_time(1, now), queue.tokens.wait_time(tokens, now))
+                    if wait == 0.0:
+                        queue.requests.take(1)
+                        queue.tokens.take(tokens)
+                        heapq.heappop(queue.waiters)
+                        LLM_QUEUE_DEPTH.set(len(queue.waiters), model=model)
+                        self._record(queue, priority, now - started)
+                        queue.cond.notify_all()
+                        return True
+                if give_up_at is not None and now >= give_up_at:
+                    queue.waiters.remove(entry)
+                    heapq.heapify(queue.waiters)
+                    queue.timeouts += 1
+                    LLM_QUEUE_DEPTH.set(len(queue.waiters), model=model)
+                    LLM_QUEUE_TIMEOUTS.inc(model=model)
+                    queue.cond.notify_all()
+                    return False
+                # The head sleeps until its refill is due; others until woken (or their timeout)
+                if give_up_at is not None:
+                    wait = min(wait if wait is not None else give_up_at - now, give_up_at - now)
+                queue.cond.wait(wait)
+
+    def settle(self, model: str, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the real usage is known."""
+        if actual is None:
+            return
+        queue = self._queue(model)
+        with queue.cond:
+            if actual < estimated:
+                queue.tokens.give_back(estimated - actual)
+                queue.cond.notify_all()
+            else:
+                queue.tokens.take(actual - estimated)
+
+    @staticmethod
+    def _record(queue: _ModelQueue, priority: int, waited: float):
+        queue.admitted += 1
+        queue.total_wait += waited
+        queue.waits.append(waited)
+        queue.waits_by_priority[priority] = queue.waits_by_priority.get(priority, 0.0) + waited
+        LLM_QUEUE_WAIT_SECONDS.observe(waited, model=queue.model, priority=PRIORITY_NAMES.get(priority, str(priority)))
+
+    # ---------------------------------------------------------
+    def snapshot(self) -> Dict[str, dict]:
+        """Queue depth and wait-time metrics per model."""
+        with self._lock:
+            queues = dict(self._queues)
+        report = {}
+        for model, queue in queues.items():
+            with queue.cond:
+                waits = sorted(queue.waits)
+                report[model] = {
+                    "queue_depth": len(queue.waiters),
+                    "max_queue_depth": queue.max_depth,
+                    "admitted": queue.admitted,
+                    "timeouts": queue.timeouts,
+                    "avg_wait_ms": round(queue.total_wait / queue.admitted * 1000, 2) if queue.admitted else 0.0,
+                    "p95_wait_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 2) if waits else 0.0,
+                    "wait_seconds_by_priority": {PRIORITY_NAMES.get(p, str(p)): round(w, 3)
+                                                 for p, w in queue.waits_by_priority.items()},
+                    "requests_available": round(queue.requests.level, 2),
+                    "tokens_available": round(queue.tokens.level),
+                }
+        return report
+
+
+# ---------------------------------------------------------
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def shared_scheduler() -> RequestScheduler:
+    """The process-wide scheduler used by every Groq call."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
@@ -0,0 +1,370 @@
+# resilience.py
+"""
+Resilience layer for the OpenAI-compatible Groq client.
+
+`ResilientChatClient` wraps a client and exposes the same
+`client.chat.completions.create(...)` call, adding:
+
+- a per-call deadline that covers every attempt (each attempt gets the remaining
+  time as its HTTP timeout)
+- retries with full-jitter exponential backoff for 429, 5xx, timeouts and
+  connection errors (honouring Retry-After when the server sends it)
+- optional hedging: if the first attempt is still running after the observed p95
+  latency, a second identical request is raised and the first reply wins
+- a circuit breaker shared by every service using the client. While it is open,
+  calls fail immediately with CircuitOpenError so callers can go straight to
+  their local fallback instead of waiting out the deadline.
+- admission through the shared RPM/TPM scheduler (rate_limiter.py), so bursts
+  queue locally instead of hitting 429s. Pass `priority=` to create() to pick the
+  queue class; it is not forwarded to the API.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from ai.config import config
+from ai.services.rate_limiter import NORMAL, shared_scheduler
+from ai.utils.context_builder import count_tokens
+from ai.utils.metrics import LLM_RETRIES, LLM_SECONDS, LLM_TOKENS
+from ai.utils.tracing import current_span, span
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's overall deadline ran out before any attempt succeeded."""
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------
+class CircuitBreaker:
+    """
+    Classic three-state breaker. Opens after `failure_threshold` consecutive
+    upstream failures, lets a single probe through after `reset_timeout` seconds
+    (half-open), and closes again when the probe succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected: open and not yet due for a probe, or half-open with the probe in flight."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == "half_open" and self._probe_in_flight
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """
+        Free the half-open probe slot without judging upstream health (the call
+        never reached Groq, or failed for reasons of its own). The state and the
+        failure streak are left as they are.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Groq circuit breaker opened", extra={"failures": self.failures})
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, for the hedging threshold."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+# ---------------------------------------------------------
+class ResilientChatClient:
+    """
+    Drop-in wrapper: `ResilientChatClient(factory).chat.completions.create(**kwargs)`.
+
+    Parameters:
+    -----------
+    client_factory : Callable
+        Returns the underlying OpenAI-compatible client (created on first use).
+        Give it max_retries=0; retries are handled here.
+    deadline : float
+        Seconds allowed for the whole call, retries included
+    max_retries : int
+        Extra attempts after the first for retryable errors
+    hedge : bool
+        Send a second request once the first exceeds the observed p95 latency
+    """
+
+    def __init__(self, client_factory: Callable, deadline: float = None, max_retries: int = None,
+                 base_delay: float = 0.25, max_delay: float = 4.0, hedge: bool = None,
+                 breaker: CircuitBreaker = None, scheduler=None):
+        self._factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.deadline = deadline or config.groq_deadline_seconds
+        self.max_retries = config.groq_max_retries if max_retries is None else max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = config.groq_hedge if hedge is None else hedge
+        self.breaker = breaker or CircuitBreaker(config.groq_breaker_failures, config.groq_breaker_reset_seconds)
+        self.latency = LatencyTracker()
+        self.scheduler = scheduler or shared_scheduler()
+        self._hedge_pool = None
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "failures": 0, "short_circuits": 0,
+                      "rate_limit_timeouts": 0}
+        self._stats_lock = threading.Lock()
+        # Same shape as the OpenAI client so services can use it unchanged
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.breaker.is_open
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    # ---------------------------------------------------------
+    @staticmethod
+    def estimate_prompt_tokens(kwargs) -> int:
+        return sum(count_tokens(m.get("content") or "") + 4 for m in kwargs.get("messages", []))
+
+    @classmethod
+    def estimate_tokens(cls, kwargs) -> int:
+        """Prompt tokens plus the completion allowance, for rate-limit admission."""
+        return cls.estimate_prompt_tokens(kwargs) + int(kwargs.get("max_tokens") or 256)
+
+    def create(self, priority: int = NORMAL, **kwargs):
+        """chat.completions.create with rate limiting, deadline, retries, hedging and the breaker."""
+        model = kwargs.get("model", config.groq_chat_model)
+        started = time.perf_counter()
+        outcome = "error"
+        with span("llm.chat_completion", model=model, priority=priority) as call_span:
+            try:
+                response = self._create(model, priority, kwargs)
+                outcome = "ok"
+            except CircuitOpenError:
+                outcome = "short_circuit"
+                raise
+            except DeadlineExceeded:
+                outcome = "deadline"
+                raise
+            finally:
+                LLM_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+                call_span.set_attribute("outcome", outcome)
+
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, kind="prompt")
+                LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, kind="completion")
+                call_span.set_attribute("prompt_tokens", getattr(usage, "prompt_tokens", None))
+                call_span.set_attribute("completion_tokens", getattr(usage, "completion_tokens", None))
+            return response
+
+    def _create(self, model, priority, kwargs):
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            raise CircuitOpenError("Groq circuit breaker is open")
+        self._count("calls")
+
+        tokens = self.estimate_tokens(kwargs)
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                self._count("failures")
+                self.breaker.record_failure()
+                raise DeadlineExceeded(f"Groq call exceeded its {self.deadline:.1f}s deadline")
+            # Queue for an RPM/TPM slot; running out of time here is local, not an upstream failure
+            with span("llm.rate_limit_wait", estimated_tokens=tokens) as wait_span:
+                admitted = self.scheduler.acquire(model, tokens, priority, timeout=remaining)
+                wait_span.set_attribute("admitted", admitted)
+            if not admitted:
+                self._count("rate_limit_timeouts")
+                self.breaker.release_probe()
+                raise DeadlineExceeded(f"Groq call waited its whole {self.deadline:.1f}s deadline for a rate-limit slot")
+            remaining = give_up_at - time.monotonic()
+            try:
+                started = time.monotonic()
+                with span("llm.attempt", attempt=attempt, timeout_s=round(remaining, 3)):
+                    response = self._attempt(kwargs, remaining, model, tokens, priority)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Caller errors (bad request, auth) say nothing about upstream health
+                    self.breaker.release_probe()
+                    raise
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+                delay = _retry_after(e) or random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if time.monotonic() + delay >= give_up_at:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self._count("retries")
+                LLM_RETRIES.inc(model=model)
+                current_span().add_event("retry", {"attempt": attempt, "delay_s": round(delay, 3),
+                                                   "error": type(e).__name__})
+                time.sleep(delay)
+                continue
+            self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return response
+
+    def _send(self, kwargs, timeout, model, tokens):
+        """
+        One upstream request. Every request settles the tokens it was admitted
+        with: the reported usage on success, and on failure only the prompt
+        estimate (no completion was generated). This includes hedges whose
+        result is discarded.
+        """
+        try:
+            response = self.client.chat.completions.create(timeout=timeout, **kwargs)
+        except Exception:
+            self.scheduler.settle(model, tokens, self.estimate_prompt_tokens(kwargs))
+            raise
+        usage = getattr(response, "usage", None)
+        self.scheduler.settle(model, tokens, getattr(usage, "total_tokens", None))
+        return response
+
+    def _attempt(self, kwargs, timeout, model, tokens, priority):
+        hedge_after = self.latency.p95() if self.hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            return self._send(kwargs, timeout, model, tokens)
+
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="groq-hedge")
+        started = time.monotonic()
+        primary = self._hedge_pool.submit(self._send, kwargs, timeout, model, tokens)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        # The hedge is a real extra request, so it needs a free slot right now
+        if not self.scheduler.acquire(model, tokens, priority, timeout=0):
+            return primary.result(timeout=max(timeout - (time.monotonic() - started), 0))
+        self._count("hedges")
+        current_span().add_event("hedge", {"after_s": round(hedge_after, 3)})
+        backup = self._hedge_pool.submit(self._send, kwargs, timeout - (time.monotonic() - started), model, tokens)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(timeout - (time.monotonic() - started), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    # The slower request is left to finish in the background
+                    return future.result()
+                error = future.exception()
+        raise error or DeadlineExceeded("Hedged Groq call timed out")
+
+
+# ---------------------------------------------------------
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def shared_groq_client() -> ResilientChatClient:
+    """
+    Process-wide resilient Groq client, so the conversation and emotion services
+    share one breaker and one latency history.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                def factory():
+                    import os
+                    from openai import OpenAI
+                    return OpenAI(
+                        api_key=os.getenv("GROQ_API_KEY"),
+                        base_url=os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
+                        max_retries=0
+                    )
+                _shared_client = ResilientChatClient(factory)
+    return _shared_client
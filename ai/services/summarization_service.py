@@ -0,0 +1,161 @@
+# summarization_service.py
+"""
+Rolling conversation summaries.
+
+Every `every` new turns, the turns older than the last `keep_recent` are folded
+into `ConversationContext.running_summary` in a background thread. Prompts then
+send the summary plus the unsummarized turns, so their size stays flat as a
+session grows, but long-range context is kept.
+
+Summaries come from the cheaper `groq_chat_model` when a client is available.
+Otherwise, or if the call fails, a local extractive summary keeps the user's
+most telling sentences.
+"""
+
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from ai.config import config
+from ai.services.rate_limiter import BATCH
+from ai.services.resilience import ResilientChatClient
+from ai.models.conversation import ConversationContext, ConversationTurn
+from ai.utils.context_builder import count_tokens, truncate_to_tokens
+from ai.utils.metrics import FALLBACKS
+from ai.utils.prompt_utils import CONVERSATION_SUMMARY
+
+logger = logging.getLogger(__name__)
+
+# Words that mark a sentence as worth keeping in the extractive fallback
+SIGNAL_WORDS = (
+    "worried", "anxious", "scared", "stress", "ashamed", "avoid", "ignore", "put off",
+    "impulse", "buy", "spend", "debt", "credit", "loan", "save", "saving", "budget",
+    "rent", "bill", "goal", "want", "income", "paycheck", "confused", "forget",
+)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+class ConversationSummarizer:
+    """
+    Maintains `summary_state` (running summary, summarized turns) on ConversationContext objects.
+
+    Parameters:
+    -----------
+    client_factory : Callable, optional
+        Returns an OpenAI-compatible client; None means extractive summaries only
+    every : int
+        Summarize once this many turns have accumulated past `keep_recent`
+    keep_recent : int
+        Turns always left verbatim for the prompt
+    max_tokens : int
+        Size cap on the running summary
+    """
+
+    def __init__(self, client_factory: Optional[Callable] = None, every: int = None,
+                 keep_recent: int = None, max_tokens: int = None):
+        self.client_factory = client_factory
+        self.every = every or config.summary_every_turns
+        self.keep_recent = keep_recent or config.summary_keep_recent
+        self.max_tokens = max_tokens or config.summary_max_tokens
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capcoach-summary")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    def maybe_schedule(self, context: ConversationContext):
+        """
+        Queue a background summary if enough turns have piled up.
+        Returns the Future, or None if nothing was scheduled.
+        """
+        backlog = len(context.turns) - context.summarized_turns - self.keep_recent
+        if backlog < self.every:
+            return None
+        with self._lock:
+            if context.session_id in self._pending:
+                return None
+            self._pending.add(context.session_id)
+        return self._executor.submit(self._run, context)
+
+    def _run(self, context: ConversationContext):
+        try:
+            self.summarize(context)
+        except Exception as e:
+            logger.warning("Summary update failed", extra={"session_id": context.session_id, "error": str(e)})
+        finally:
+            with self._lock:
+                self._pending.discard(context.session_id)
+
+    def summarize(self, context: ConversationContext) -> Optional[str]:
+        """Fold everything except the last `keep_recent` turns into the running summary."""
+        previous, start = context.summary_state
+        end = len(context.turns) - self.keep_recent
+        if end <= start:
+            return previous
+
+        new_turns = context.turns[start:end]
+        summary = None
+        if self.client_factory is not None:
+            summary = self._llm_summary(previous, new_turns)
+        if not summary:
+            summary = self.extractive_summary(previous, new_turns)
+
+        # One tuple store publishes both; readers unpack the same tuple (get_summary_context)
+        summary = truncate_to_tokens(summary, self.max_tokens)
+        context.summary_state = (summary, end)
+        return summary
+
+    # ---------------------------------------------------------
+    def _llm_summary(self, previous: Optional[str], turns: List[ConversationTurn]) -> Optional[str]:
+        messages = CONVERSATION_SUMMARY.messages(
+            summary=previous or "(none yet)",
+            turns="\n".join(f"{turn.speaker}: {turn.text.strip()}" for turn in turns),
+            max_words=int(self.max_tokens * 0.7),
+        )
+        try:
+            client = self.client_factory()
+            # Summaries are background work: let interactive chat go first under rate limits
+            extra = {"priority": BATCH} if isinstance(client, ResilientChatClient) else {}
+            response = client.chat.completions.create(
+                model=config.groq_chat_model,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=self.max_tokens,
+                **extra
+            )
+            return (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            FALLBACKS.inc(service="groq_summary", reason="api_error")
+            logger.warning("Groq summary failed, using extractive summary", extra={"error": str(e)})
+            return None
+
+    def extractive_summary(self, previous: Optional[str], turns: List[ConversationTurn]) -> str:
+        """
+        Keep the highest-signal user sentences (emotion/pattern words, amounts),
+        in their original order, appended to the previous summary.
+        """
+        scored = []
+        for turn_index, turn in enumerate(turns):
+            if turn.speaker != "user":
+                continue
+            weight = 1.0 + max((turn.emotions or {}).values(), default=0.0) + max((turn.patterns or {}).values(), default=0.0)
+            for sentence in _SENTENCE_SPLIT.split(turn.text.strip()):
+                lowered = sentence.lower()
+                hits = sum(word in lowered for word in SIGNAL_WORDS) + bool(re.search(r"\d", sentence))
+                if hits:
+                    scored.append((hits * weight, turn_index, sentence.strip()))
+
+        # Best sentences first until half the budget is used, then restore conversation order
+        budget = self.max_tokens // 2
+        chosen = []
+        for score, turn_index, sentence in sorted(scored, key=lambda x: -x[0]):
+            cost = count_tokens(sentence)
+            if cost > budget:
+                continue
+            chosen.append((turn_index, sentence))
+            budget -= cost
+        new_part = " ".join(f"User said: \"{s}\"" for _, s in sorted(chosen, key=lambda x: x[0]))
+
+        parts = [p for p in (previous, new_part) if p]
+        return " ".join(parts) if parts else "Earlier turns were small talk with no financial details."
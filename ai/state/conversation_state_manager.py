@@ -6,6 +6,8 @@ from typing import Dict, List, Optional
 from ai.models.conversation import ConversationTurn, ConversationContext
 from ai.models.emotions import SessionEmotions
 from ai.models.patterns import SessionPatterns
+from ai.utils.metrics import STATE_SECONDS, timed
+from ai.utils.tracing import traced
 
 
 class ConversationStateManager:
@@ -18,6 +20,7 @@ class ConversationStateManager:
         self.sessions: Dict[str, ConversationContext] = {}
 
     # ---------------------------------------------------------
+    @timed(STATE_SECONDS, operation="create_session")
     def create_session(self, session_id: str):
         """
         Initialize a new conversation context for a session.
@@ -25,6 +28,8 @@ class ConversationStateManager:
         self.sessions[session_id] = ConversationContext(session_id=session_id)
 
     # ---------------------------------------------------------
+    @traced("state.add_turn")
+    @timed(STATE_SECONDS, operation="add_turn")
     def add_turn(self, session_id: str, turn: ConversationTurn):
         """
         Add a new turn (user or AI) to the session.
@@ -45,6 +50,7 @@ class ConversationStateManager:
             return None
         return session.last_user_message()
 
+    @timed(STATE_SECONDS, operation="get_recent_turns")
     def get_recent_turns(self, session_id: str, n: int = 5) -> List[ConversationTurn]:
         """
         Return the last n turns for AI prompting.
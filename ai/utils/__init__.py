@@ -2,12 +2,18 @@
 CAPcoach Utility Functions
 """
 
-from .prompt_utils import build_empathy_prompt
+from .prompt_utils import build_empathy_prompt, build_empathy_messages, get_prompt, PROMPTS
+from .context_builder import build_conversation_prompt, count_tokens
 from .text_cleaning import clean_text
 from .scoring_utils import normalize_scores, aggregate_scores
 
 __all__ = [
     'build_empathy_prompt',
+    'build_empathy_messages',
+    'get_prompt',
+    'PROMPTS',
+    'build_conversation_prompt',
+    'count_tokens',
     'clean_text', 
     'normalize_scores',
     'aggregate_scores'
@@ -0,0 +1,154 @@
+# context_builder.py
+"""
+Token-budgeted prompt construction for the conversation services.
+
+Instead of pasting a fixed number of turns and raw dict reprs into the prompt,
+`build_conversation_prompt` packs as many recent turns as fit a token budget
+(newest first, so the oldest are dropped or truncated first) and renders
+emotion / pattern scores compactly.
+
+Token counts come from tiktoken when it is installed (the encoder is loaded once
+and cached). Otherwise a byte-based estimate is used (~4 UTF-8 bytes per token),
+which is close enough for budgeting Llama-family prompts.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Dict, Iterable, List, Optional
+
+from ai.utils.prompt_utils import CONVERSATION, PromptTemplate
+
+TIKTOKEN_AVAILABLE = find_spec("tiktoken") is not None
+BYTES_PER_TOKEN = 4
+# Don't bother keeping a truncated turn shorter than this
+MIN_TRUNCATED_TOKENS = 16
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Token count for `text` (exact with tiktoken, estimated otherwise)."""
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = True) -> str:
+    """Cut `text` to about `max_tokens`, keeping the end (or start) and marking the cut."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text)
+        kept = encoder.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
+    else:
+        data = text.encode("utf-8")
+        limit = max_tokens * BYTES_PER_TOKEN
+        kept = (data[-limit:] if keep_end else data[:limit]).decode("utf-8", errors="ignore")
+    return f"…{kept.lstrip()}" if keep_end else f"{kept.rstrip()}…"
+
+
+def render_scores(scores: Optional[Dict[str, float]], min_score: float = 0.05, limit: int = 4) -> str:
+    """
+    Compact rendering of a score dict: "anxious 0.67, avoidance 0.5".
+    Scores below `min_score` are left out; at most `limit` are shown, highest first.
+    """
+    if not scores:
+        return "none"
+    shown = sorted(((k, v) for k, v in scores.items() if v >= min_score), key=lambda x: -x[1])[:limit]
+    if not shown:
+        return "none"
+    return ", ".join(f"{name} {round(score, 2):g}" for name, score in shown)
+
+
+# ---------------------------------------------------------
+@dataclass
+class BuiltPrompt:
+    """A rendered prompt plus the bookkeeping the caller reports."""
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    turns_included: int
+    turns_available: int
+    truncated: bool = False
+
+    @property
+    def text(self) -> str:
+        """The dynamic (user) part of the prompt."""
+        return self.messages[-1]["content"]
+
+
+def build_conversation_prompt(
+    turns: Iterable,
+    user_message: str,
+    emotions: Optional[Dict[str, float]],
+    patterns: Optional[Dict[str, float]],
+    token_budget: int,
+    template: PromptTemplate = CONVERSATION,
+    summary: Optional[str] = None,
+) -> BuiltPrompt:
+    """
+    Render `template` with as much recent history as fits `token_budget`.
+    The budget covers both the static system message and the dynamic user message.
+
+    Parameters:
+    -----------
+    turns : iterable of ConversationTurn
+        Conversation history, oldest first (anything with .speaker and .text)
+    user_message : str
+        The message being answered; always included (truncated only if it alone
+        would exceed half the budget)
+    token_budget : int
+        Upper bound on prompt tokens, including the template
+    summary : str, optional
+        Running summary of turns older than `turns`; always kept, ahead of the turns
+    """
+    turns = list(turns)
+    emotions_text, patterns_text = render_scores(emotions), render_scores(patterns)
+    summary_text = f"Earlier in the conversation: {summary.strip()}\n\n" if summary else ""
+
+    fixed = template.render_user(summary=summary_text, context="", message="",
+                                 emotions=emotions_text, patterns=patterns_text)
+    remaining = token_budget - count_tokens(template.system) - count_tokens(fixed)
+
+    truncated = False
+    message = user_message
+    if count_tokens(message) > max(remaining // 2, MIN_TRUNCATED_TOKENS):
+        message = truncate_to_tokens(message, max(remaining // 2, MIN_TRUNCATED_TOKENS), keep_end=False)
+        truncated = True
+    remaining -= count_tokens(message)
+
+    # Newest turns first; the oldest turn that doesn't fit is truncated, the rest dropped
+    lines = []
+    for turn in reversed(turns):
+        line = f"{turn.speaker}: {turn.text.strip()}"
+        cost = count_tokens(line) + 1   # + newline
+        if cost <= remaining:
+            lines.append(line)
+            remaining -= cost
+            continue
+        if remaining - 1 >= MIN_TRUNCATED_TOKENS:
+            lines.append(f"{turn.speaker}: {truncate_to_tokens(turn.text.strip(), remaining - 1 - count_tokens(turn.speaker + ': '))}")
+            truncated = True
+        break
+    lines.reverse()
+
+    messages = template.messages(summary=summary_text, context="\n".join(lines) or "(start of conversation)",
+                                 message=message, emotions=emotions_text, patterns=patterns_text)
+    return BuiltPrompt(
+        messages=messages,
+        prompt_tokens=count_tokens(template.system) + count_tokens(messages[-1]["content"]),
+        turns_included=len(lines),
+        turns_available=len(turns),
+        truncated=truncated or len(lines) < len(turns),
+    )
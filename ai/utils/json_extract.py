@@ -0,0 +1,60 @@
+# json_extract.py
+"""
+Tolerant JSON extraction for LLM output.
+
+Models asked for "only JSON" still sometimes wrap it in ``` fences, add a line of
+prose, or get cut off by max_tokens. `extract_json_object` recovers the object in
+all of those cases instead of failing the whole request.
+"""
+
+import json
+import re
+from typing import Optional
+
+_decoder = json.JSONDecoder()
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+# "key": number pairs, used to salvage truncated objects
+_NUMBER_PAIR = re.compile(r'"([^"\\]+)"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)')
+
+
+def extract_json_object(text: Optional[str]) -> Optional[dict]:
+    """
+    Return the first JSON object found in `text`, or None.
+
+    Tries, in order: the whole string, the contents of a code fence, the first
+    decodable `{...}` anywhere in the text, and finally the `"key": number` pairs
+    of a truncated object.
+    """
+    if not text:
+        return None
+    text = text.strip()
+
+    # Fast path: a clean object, as JSON mode returns
+    if text.startswith("{"):
+        try:
+            value = json.loads(text)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+
+    fenced = _FENCE.search(text)
+    candidates = [fenced.group(1).strip(), text] if fenced else [text]
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start != -1:
+            try:
+                value, _ = _decoder.raw_decode(candidate, start)
+                if isinstance(value, dict):
+                    return value
+            except ValueError:
+                pass
+            start = candidate.find("{", start + 1)
+
+    # Truncated output: keep whatever complete "key": number pairs made it through
+    start = text.find("{")
+    if start != -1:
+        pairs = _NUMBER_PAIR.findall(text, start)
+        if pairs:
+            return {key: float(value) for key, value in pairs}
+    return None
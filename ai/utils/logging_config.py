@@ -0,0 +1,196 @@
+"""
+logging_config.py
+----------------
+Structured, non-blocking logging for the CAPcoach services.
+
+Modules log through the standard library (`logging.getLogger(__name__)`) and
+pass structured fields with `extra=`:
+
+    logger.warning("Groq emotion analysis failed", extra={"error": str(e)})
+
+`configure_logging()` (called once by the Flask app) installs a QueueHandler
+on the root logger. Request threads only put records on an in-memory queue. A
+QueueListener thread formats them (JSON lines by default) and writes them to
+stderr. If the queue is full, records are dropped and counted; the request
+thread never waits on log I/O.
+
+DEBUG records are sampled: only `CAPCOACH_LOG_DEBUG_SAMPLE` of them (default
+1%) are kept. A single call can set its own rate with
+`extra={"sample_rate": 0.1}`.
+
+Records logged while a request is in flight carry its request_id, session_id
+and (when the request is traced) trace_id; see tracing.py.
+
+Environment:
+    CAPCOACH_LOG_LEVEL         DEBUG / INFO (default) / WARNING / ...
+    CAPCOACH_LOG_FORMAT        json (default) or text
+    CAPCOACH_LOG_DEBUG_SAMPLE  share of DEBUG records kept (0-1)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from ai.utils.tracing import correlation_ids
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sample_rate"}
+
+QUEUE_SIZE = 10000
+
+# Client libraries that log every HTTP request at INFO/DEBUG
+NOISY_LOGGERS = ("werkzeug", "openai", "httpx", "httpcore", "urllib3")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, then the `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with the `extra=` fields appended."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {k: v for k, v in record.__dict__.items() if k not in _STANDARD_ATTRS and not k.startswith("_")}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every INFO+ record and a random `debug_rate` share of DEBUG records."""
+
+    def __init__(self, debug_rate: float = 0.01):
+        super().__init__()
+        self.debug_rate = debug_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            if record.levelno > logging.DEBUG:
+                return True
+            rate = self.debug_rate
+        return rate >= 1.0 or random.random() < rate
+
+
+class CorrelationFilter(logging.Filter):
+    """Adds the current request's correlation ids, unless the call passed its own."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in correlation_ids().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# ---------------------------------------------------------
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: str = None, fmt: str = None, debug_sample_rate: float = None, stream=None):
+    """
+    Route all logging through a background QueueListener. Safe to call more
+    than once; only the first call installs handlers.
+    """
+    global _listener, _handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+        level = (level or os.getenv("CAPCOACH_LOG_LEVEL", "INFO")).upper()
+        fmt = fmt or os.getenv("CAPCOACH_LOG_FORMAT", "json")
+        if debug_sample_rate is None:
+            debug_sample_rate = float(os.getenv("CAPCOACH_LOG_DEBUG_SAMPLE", "0.01"))
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=QUEUE_SIZE))
+        _handler.addFilter(SamplingFilter(debug_sample_rate))
+        # Handler filters run on the logging caller's thread, so the request context is still visible
+        _handler.addFilter(CorrelationFilter())
+
+        root = logging.getLogger()
+        root.handlers = [_handler]
+        root.setLevel(level)
+        # Per-request access/HTTP-client lines would multiply the log volume
+        for name in NOISY_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def _restart_listener_in_child():
+    # A forked process (gunicorn worker) inherits the queue but not the listener
+    # thread. The inherited queue's mutex may have been held by another thread at
+    # fork time, so the child gets a fresh queue and a new listener on it; records
+    # still queued in the parent are the parent's to write.
+    global _listener, _configure_lock
+    _configure_lock = threading.Lock()
+    if _listener is not None:
+        _handler.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(_handler.queue, *_listener.handlers,
+                                                   respect_handler_level=_listener.respect_handler_level)
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            # Late records (e.g. from __del__ at interpreter exit) fall back to logging.lastResort
+            logging.getLogger().removeHandler(_handler)
+            _listener.stop()
+            _listener = None
+
+
+def dropped_records() -> int:
+    """Records discarded because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,332 @@
+"""
+metrics.py
+----------------
+In-process counters, gauges and latency histograms for CAPcoach, rendered in the
+Prometheus text format by the Flask app's /metrics endpoint.
+
+Every metric the app records is declared at the bottom of this module, so
+/metrics has a fixed, documented set of series:
+
+    with FORECAST_SECONDS.time():
+        ...
+
+    @timed(ANALYZER_SECONDS, analyzer="keyword_emotions")
+    def analyze_emotional_content(self, text): ...
+
+    FALLBACKS.inc(service="groq_emotions", reason="api_error")
+
+Set CAPCOACH_METRICS=0 (or call set_enabled(False)) to turn recording off.
+Disabled timers and decorators cost one flag check, well under a microsecond
+per call. On hot paths, bind labels once with `.labels(...)`. prometheus_client is not needed.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers in-process analyzers (sub-millisecond) up to slow forecasts and renders
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = os.getenv("CAPCOACH_METRICS", "1") != "0"
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ---------------------------------------------------------
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if _enabled:
+            self._inc(self._key(labels), amount)
+
+    def labels(self, **labels) -> "_BoundCounter":
+        """This counter with its labels resolved once, for hot paths."""
+        return _BoundCounter(self, self._key(labels))
+
+    def _inc(self, key: Tuple, amount: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value:g}" for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """Current value per label set (e.g. a queue depth)."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if _enabled:
+            key = self._key(labels)
+            with self._lock:
+                self._values[key] = value
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Bucketed distribution (seconds by default) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, _Series] = {}
+
+    def observe(self, value: float, **labels):
+        if _enabled:
+            self._observe(self._key(labels), value)
+
+    def labels(self, **labels) -> "_BoundHistogram":
+        """This histogram with its labels resolved once, for hot paths."""
+        return _BoundHistogram(self, self._key(labels))
+
+    def time(self, **labels):
+        """Context manager observing the elapsed time of its block."""
+        return _Timer(self, self._key(labels)) if _enabled else _NULL_TIMER
+
+    def _observe(self, key: Tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series.count if series else 0
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            snapshot = {key: (list(s.counts), s.sum, s.count) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class _BoundCounter:
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric: Counter, key: Tuple):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount: float = 1):
+        if _enabled:
+            self.metric._inc(self.key, amount)
+
+
+class _BoundHistogram:
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric: Histogram, key: Tuple):
+        self.metric = metric
+        self.key = key
+
+    def observe(self, value: float):
+        if _enabled:
+            self.metric._observe(self.key, value)
+
+    def time(self):
+        return _Timer(self.metric, self.key) if _enabled else _NULL_TIMER
+
+
+class _Timer:
+    __slots__ = ("histogram", "key", "started")
+
+    def __init__(self, histogram: Histogram, key: Tuple):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator recording each call's duration in `histogram` (sync or async functions)."""
+    observe, key = histogram._observe, histogram._key(labels)
+
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    observe(key, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(key, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+# ---------------------------------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ---------------------------------------------------------
+# Metric catalog
+# ---------------------------------------------------------
+HTTP_SECONDS = histogram("capcoach_http_request_seconds", "Flask request latency",
+                         ("endpoint", "method", "status"))
+LLM_SECONDS = histogram("capcoach_llm_request_seconds",
+                        "Groq chat completion latency per call, retries and rate-limit waits included",
+                        ("model", "outcome"))
+LLM_TOKENS = counter("capcoach_llm_tokens_total", "Tokens reported by Groq responses", ("model", "kind"))
+LLM_RETRIES = counter("capcoach_llm_retries_total", "Groq attempts retried after a retryable error", ("model",))
+LLM_QUEUE_DEPTH = gauge("capcoach_llm_queue_depth", "Groq calls waiting for a client-side rate-limit slot", ("model",))
+LLM_QUEUE_WAIT_SECONDS = histogram("capcoach_llm_queue_wait_seconds",
+                                   "Time Groq calls waited for a client-side rate-limit slot", ("model", "priority"))
+LLM_QUEUE_TIMEOUTS = counter("capcoach_llm_queue_timeouts_total",
+                             "Groq calls that gave up waiting for a client-side rate-limit slot", ("model",))
+FALLBACKS = counter("capcoach_fallbacks_total", "Requests served by a local fallback instead of Groq",
+                    ("service", "reason"))
+CACHE_REQUESTS = counter("capcoach_cache_requests_total", "Cache lookups by result", ("cache", "result"))
+ANALYZER_SECONDS = histogram("capcoach_analyzer_seconds", "Emotion and pattern analyzer latency", ("analyzer",))
+STATE_SECONDS = histogram("capcoach_state_operation_seconds", "Conversation state manager operations",
+                          ("operation",))
+FORECAST_SECONDS = histogram("capcoach_forecast_seconds", "Net-worth forecast model fits")
+VIDEO_SECONDS = histogram("capcoach_video_render_seconds", "Budgeting video generation", ("mode",))
@@ -1,23 +1,177 @@
 # prompt_utils.py
 """
 Helper functions to build prompts for AI models.
+
+Prompts are split into a static system message and a small dynamic user message.
+The system part of each template is byte-identical on every call, so
+OpenAI-compatible backends that cache prompt prefixes can reuse it. Only the
+short user suffix changes per request.
+
+Templates are versioned (bump `version` whenever the system text changes, so cache
+behaviour and logged outputs can be attributed). They are compiled once at import:
+the system message dict is built a single time and shared, and the user part is
+checked for placeholders up front.
 """
 
-from typing import Dict
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Dict, List
 
-def build_empathy_prompt(user_message: str, emotions: Dict[str, float], patterns: Dict[str, float], next_question: str) -> str:
+
+@dataclass(frozen=True)
+class PromptTemplate:
     """
-    Builds a system/user prompt string for generating empathetic responses.
+    A versioned prompt: static `system` text plus a `user` format string.
     """
-    prompt = f"""
-User message: {user_message}
+    name: str
+    version: int
+    system: str
+    user: str
+    fields: frozenset = field(init=False)
+    system_message: Dict[str, str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Precompile: the placeholder set and the shared, never-rebuilt system message
+        names = frozenset(f for _, f, _, _ in Formatter().parse(self.user) if f)
+        object.__setattr__(self, "fields", names)
+        object.__setattr__(self, "system_message", {"role": "system", "content": self.system})
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def render_user(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.key} is missing values for: {', '.join(sorted(missing))}")
+        return self.user.format(**values)
+
+    def messages(self, **values) -> List[Dict[str, str]]:
+        """Chat messages: the shared system message followed by the rendered user part."""
+        return [self.system_message, {"role": "user", "content": self.render_user(**values)}]
+
+
+# ---------------------------------------------------------
+# Templates
+# ---------------------------------------------------------
+
+CONVERSATION = PromptTemplate(
+    name="conversation",
+    version=2,
+    system="""You are CAPcoach, a compassionate financial therapist AI. You're having a conversation about money habits and financial wellness.
+
+Your role:
+- Show deep empathy and understanding of financial emotions
+- Ask insightful, gentle questions to uncover financial patterns
+- Provide supportive guidance, not direct financial advice
+- Help users understand their relationship with money
+- Keep responses conversational, warm, and encouraging
+- Validate their feelings and experiences
+
+Each user message gives you the recent conversation, the user's latest message, and the
+emotions and financial patterns detected in it. Respond naturally to the latest message and
+continue the conversation in a supportive way.""",
+    user="""Recent conversation context:
+{summary}{context}
+
+User's latest message: "{message}"
+
 Detected emotions: {emotions}
-Detected patterns: {patterns}
-Next question to ask: {next_question}
+Detected financial patterns: {patterns}""",
+)
+
+GREETING = PromptTemplate(
+    name="greeting",
+    version=2,
+    system="""You are CAPcoach, a warm, empathetic financial coach. Create a short, friendly greeting for
+the start of a financial wellness conversation: introduce yourself as CAPcoach and invite the
+user to share about their financial habits. Reply with the greeting only.""",
+    user="User: {name}",
+)
+
+# Fixed vocabulary for LLM emotion scores; anything else the model returns is mapped or dropped
+EMOTION_VOCABULARY = ("anxious", "happy", "sad", "angry", "fearful",
+                      "overwhelmed", "confident", "hopeful", "stressed", "calm")
+
+EMOTION_ANALYSIS = PromptTemplate(
+    name="emotion_analysis",
+    version=3,
+    system=f"""Analyze the emotional content of the user's text about finances and return ONLY a JSON object with emotion scores between 0 and 1.
+
+Use only these emotions as keys: {", ".join(EMOTION_VOCABULARY)}
+
+Return format: {{"emotion1": score, "emotion2": score}}
+Example: {{"anxious": 0.8, "overwhelmed": 0.6, "stressed": 0.7}}
+
+Only return the JSON object, nothing else.""",
+    user='Text: "{text}"',
+)
+
+EMOTION_BATCH = PromptTemplate(
+    name="emotion_batch",
+    version=2,
+    system=f"""Analyze the emotional content of several texts about finances. The user message is a JSON object {{"texts": [{{"id": 0, "text": "..."}}, ...]}}.
 
-Write an empathetic, conversational response:
+Return ONLY a JSON object with one entry per text, carrying the text's id and its emotion scores between 0 and 1:
+{{"results": [{{"id": 0, "emotions": {{"anxious": 0.8, "stressed": 0.7}}}}, {{"id": 1, "emotions": {{"hopeful": 0.6}}}}]}}
+
+Use only these emotions as keys: {", ".join(EMOTION_VOCABULARY)}
+
+Only return the JSON object, nothing else.""",
+    user="{texts_json}",
+)
+
+EMPATHY = PromptTemplate(
+    name="empathy",
+    version=2,
+    system="""Write an empathetic, conversational response:
 - Validate the user's emotions
 - Explain detected patterns gently
-- Transition smoothly into the follow-up question
-"""
-    return prompt
+- Transition smoothly into the follow-up question""",
+    user="""User message: {user_message}
+Detected emotions: {emotions}
+Detected patterns: {patterns}
+Next question to ask: {next_question}""",
+)
+
+CONVERSATION_SUMMARY = PromptTemplate(
+    name="conversation_summary",
+    version=1,
+    system="""Update the running summary of a financial coaching conversation. The user message gives the
+current summary, the new turns and a word limit.
+
+Write an updated summary within the word limit. Keep the user's money habits, feelings, goals,
+concrete amounts and anything they asked to follow up on. Plain prose, no preamble.""",
+    user="""Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Word limit: {max_words}""",
+)
+
+PROMPTS: Dict[str, PromptTemplate] = {t.name: t for t in (CONVERSATION, GREETING, EMOTION_ANALYSIS, EMOTION_BATCH,
+                                                         EMPATHY, CONVERSATION_SUMMARY)}
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return PROMPTS[name]
+
+
+def build_empathy_messages(user_message: str, emotions: Dict[str, float], patterns: Dict[str, float], next_question: str) -> List[Dict[str, str]]:
+    """
+    Chat messages (static system + dynamic user) for generating empathetic responses.
+    """
+    from ai.utils.context_builder import render_scores
+    return EMPATHY.messages(user_message=user_message, emotions=render_scores(emotions),
+                            patterns=render_scores(patterns), next_question=next_question)
+
+
+def build_empathy_prompt(user_message: str, emotions: Dict[str, float], patterns: Dict[str, float], next_question: str) -> str:
+    """
+    Builds a system/user prompt string for generating empathetic responses.
+    Single-string form of build_empathy_messages, for completion-style models.
+    """
+    system, user = build_empathy_messages(user_message, emotions, patterns, next_question)
+    return f"{user['content']}\n\n{system['content']}\n"
@@ -0,0 +1,525 @@
+"""
+tracing.py
+----------------
+Span-based request tracing for CAPcoach, with per-request correlation ids.
+
+Every Flask request opens a root span (see Backend/api.py). Its request id
+(taken from an incoming X-Request-ID header or generated) and the chat
+session id travel in a context variable. Every span below it carries both, and
+so does every log record (logging_config.py adds them). The chat pipeline is
+covered stage by stage:
+
+    POST /api/ai/chat/send
+      chat.process_user_response
+        analysis.emotions / analysis.patterns
+        prompt.build
+        llm.chat_completion
+          llm.rate_limit_wait, llm.attempt (one per retry)
+        state.add_turn
+      chat.local_fallback          (circuit open or Groq failure)
+        chat.process_user_response ...
+
+Spans are created with `span()` or `@traced`, the same way metrics are timed:
+
+    with span("prompt.build", turns=len(recent_turns)) as s:
+        ...
+        s.set_attribute("prompt_tokens", prompt.prompt_tokens)
+
+    @traced("analysis.emotions", analyzer="keyword")
+    def analyze_emotional_content(self, text): ...
+
+Sampling is decided once per request at the root (head sampling):
+`CAPCOACH_TRACE_SAMPLE` of requests are traced, and an incoming W3C
+`traceparent` header with the sampled flag always is. Outside a sampled trace,
+`span()` returns a shared no-op span, so an unsampled request costs one
+context-variable lookup per instrumented call.
+
+Finished spans are queued and written by a background thread as JSON lines.
+Field names follow OTLP: trace_id, span_id, parent_span_id, start/end in unix
+nanoseconds, attributes, events and status. With `CAPCOACH_TRACE_EXPORTER=otel`
+and the opentelemetry API installed, spans go to the globally configured
+OpenTelemetry tracer instead, and its sampler and exporters apply.
+
+Environment:
+    CAPCOACH_TRACE_EXPORTER  none (default) / console / file / otel
+    CAPCOACH_TRACE_FILE      output of the file exporter (default traces/spans.jsonl)
+    CAPCOACH_TRACE_SAMPLE    share of requests traced (default 0.05)
+"""
+
+import asyncio
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "capcoach"
+DEFAULT_TRACE_FILE = "traces/spans.jsonl"
+QUEUE_SIZE = 4096
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_REQUEST_ID = re.compile(r"^[\w.\-:]{1,128}$")
+
+# Innermost open span of a sampled trace, and the request's correlation ids
+_current_span: ContextVar[Optional["Span"]] = ContextVar("capcoach_span", default=None)
+_correlation: ContextVar[Optional[Dict[str, str]]] = ContextVar("capcoach_correlation", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return random.getrandbits(nbytes * 8).to_bytes(nbytes, "big").hex()
+
+
+# ---------------------------------------------------------
+class Span:
+    """
+    One timed stage of a request. Mirrors the OpenTelemetry span methods the
+    services use: set_attribute, add_event, record_exception, is_recording.
+    """
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_span_id", "attributes", "events",
+                 "status", "status_message", "start_ns", "end_ns")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: dict,
+                 kind: str = "INTERNAL"):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.events = []
+        self.status = "UNSET"
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def is_recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: dict = None):
+        self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes or {}})
+
+    def record_exception(self, exception: BaseException):
+        """Note a failure on this span (also for exceptions that were caught and handled)."""
+        self.add_event("exception", {"exception.type": type(exception).__name__,
+                                     "exception.message": str(exception)})
+        self.status = "ERROR"
+        self.status_message = f"{type(exception).__name__}: {exception}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if _processor is not None:
+                _processor.submit(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status, "message": self.status_message},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class _NonRecordingSpan:
+    """Stand-in returned outside sampled traces; every method is a no-op."""
+
+    __slots__ = ()
+
+    def is_recording(self) -> bool:
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+class _SpanScope:
+    """Makes `span` current for the `with` block and ends it afterwards."""
+
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.record_exception(exc)
+        _current_span.reset(self.token)
+        self.span.end()
+        return False
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return NON_RECORDING_SPAN
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+# ---------------------------------------------------------
+# Exporters
+# ---------------------------------------------------------
+class ConsoleSpanExporter:
+    """Writes finished spans as JSON lines to a stream (stderr by default)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def export(self, spans: list):
+        self.stream.write("".join(json.dumps(s, default=str, ensure_ascii=False) + "\n" for s in spans))
+        self.stream.flush()
+
+    def shutdown(self):
+        pass
+
+
+class FileSpanExporter(ConsoleSpanExporter):
+    """Appends finished spans as JSON lines to `path`."""
+
+    def __init__(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(open(path, "a", encoding="utf-8"))
+
+    def shutdown(self):
+        self.stream.close()
+
+
+class _ExportQueue:
+    """
+    Hands finished spans to a background thread that exports them in batches.
+    A full queue drops spans (and counts them) rather than blocking the request.
+    """
+
+    def __init__(self, exporter, batch_size: int = 128, interval: float = 1.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def restart(self):
+        """
+        New queue and export thread, for a forked child: threads don't survive
+        fork, and the inherited queue's mutex may have been held when it happened.
+        """
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while item is not None:
+                batch.append(item.to_dict())
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception:
+                    logger.exception("Span export failed", extra={"spans": len(batch)})
+            if item is None:
+                return
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self.exporter.shutdown()
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+_processor: Optional[_ExportQueue] = None
+_otel_tracer = None
+_sample_rate = 0.0
+_configure_lock = threading.Lock()
+
+
+def configure_tracing(exporter=None, sample_rate: float = None, path=None):
+    """
+    Select where spans go: "none", "console", "file", "otel", or an exporter
+    object with export(list_of_dicts) and shutdown(). Arguments left out are
+    read from the environment. Calling again replaces the previous setup.
+    """
+    global _processor, _otel_tracer, _sample_rate
+    with _configure_lock:
+        exporter = exporter or os.getenv("CAPCOACH_TRACE_EXPORTER", "none")
+        if sample_rate is None:
+            sample_rate = float(os.getenv("CAPCOACH_TRACE_SAMPLE", "0.05"))
+        _shutdown_locked()
+
+        if exporter == "otel":
+            if find_spec("opentelemetry") is None:
+                logger.warning("CAPCOACH_TRACE_EXPORTER=otel but opentelemetry is not installed; tracing disabled")
+                return
+            from opentelemetry import trace as otel_trace
+            _otel_tracer = otel_trace.get_tracer(SERVICE_NAME)
+        elif exporter == "console":
+            _processor = _ExportQueue(ConsoleSpanExporter())
+        elif exporter == "file":
+            _processor = _ExportQueue(FileSpanExporter(path or os.getenv("CAPCOACH_TRACE_FILE", DEFAULT_TRACE_FILE)))
+        elif exporter != "none":
+            _processor = _ExportQueue(exporter)
+        _sample_rate = sample_rate
+
+
+def shutdown_tracing():
+    """Export the spans still queued and stop the exporter thread."""
+    with _configure_lock:
+        _shutdown_locked()
+
+
+def _shutdown_locked():
+    global _processor, _otel_tracer
+    if _processor is not None:
+        _processor.shutdown()
+    _processor = None
+    _otel_tracer = None
+
+
+def enabled() -> bool:
+    return _processor is not None or _otel_tracer is not None
+
+
+def dropped_spans() -> int:
+    """Spans discarded because the export queue was full."""
+    return _processor.dropped if _processor is not None else 0
+
+
+atexit.register(shutdown_tracing)
+
+
+def _restart_exporter_in_child():
+    global _configure_lock
+    _configure_lock = threading.Lock()
+    if _processor is not None:
+        _processor.restart()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_exporter_in_child)
+
+
+# ---------------------------------------------------------
+# Correlation ids
+# ---------------------------------------------------------
+def correlation_ids() -> Dict[str, str]:
+    """request_id, session_id and trace_id of the current request, when known."""
+    ids = _correlation.get()
+    fields = dict(ids) if ids else {}
+    current = _current_span.get()
+    if current is not None:
+        fields["trace_id"] = current.trace_id
+    elif _otel_tracer is not None:
+        context = _otel_current_context()
+        if context is not None:
+            fields["trace_id"] = format(context.trace_id, "032x")
+    return fields
+
+
+def set_session(session_id: Optional[str]):
+    """Attach the chat session to the current request, its open span and the spans after it."""
+    if not session_id:
+        return
+    ids = _correlation.get()
+    if ids is not None:
+        ids["session_id"] = session_id
+    current_span().set_attribute("session_id", session_id)
+
+
+def _otel_current_context():
+    from opentelemetry import trace as otel_trace
+    context = otel_trace.get_current_span().get_span_context()
+    return context if context.is_valid else None
+
+
+# ---------------------------------------------------------
+# Spans
+# ---------------------------------------------------------
+class _RequestScope:
+    """
+    Root of a trace: sets the correlation ids and makes the sampling decision.
+    Used as a context manager, or entered/exited from separate request hooks.
+    """
+
+    def __init__(self, name: str, request_id: str = None, session_id: str = None, traceparent: str = None,
+                 kind: str = "SERVER", attributes: dict = None):
+        if not request_id or not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        self.name = name
+        self.ids = {"request_id": request_id}
+        if session_id:
+            self.ids["session_id"] = session_id
+        self.traceparent = traceparent
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.span = NON_RECORDING_SPAN
+        self._scope = None
+        self._ids_token = None
+
+    @property
+    def request_id(self) -> str:
+        return self.ids["request_id"]
+
+    def __enter__(self):
+        self._ids_token = _correlation.set(self.ids)
+        if _otel_tracer is not None:
+            self._scope = self._otel_scope()
+        else:
+            root = self._sampled_root()
+            self._scope = _SpanScope(root) if root is not None else _NULL_SCOPE
+        self.span = self._scope.__enter__()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return self._scope.__exit__(exc_type, exc, tb)
+        finally:
+            _correlation.reset(self._ids_token)
+
+    def _sampled_root(self) -> Optional[Span]:
+        if _processor is None:
+            return None
+        trace_id, parent_id, sampled = None, None, None
+        match = _TRACEPARENT.match((self.traceparent or "").strip().lower())
+        if match:
+            # The caller's sampling decision wins, so its trace is never left with holes
+            trace_id, parent_id, flags = match.groups()
+            sampled = bool(int(flags, 16) & 1)
+        if sampled is None:
+            sampled = _sample_rate >= 1.0 or random.random() < _sample_rate
+        if not sampled:
+            return None
+        return Span(self.name, trace_id or _new_id(16), parent_id, {**self.ids, **self.attributes}, self.kind)
+
+    def _otel_scope(self):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.propagate import extract
+        context = extract({"traceparent": self.traceparent}) if self.traceparent else None
+        return _tracer_scope(self.name, {**self.ids, **self.attributes}, context=context,
+                             kind=getattr(otel_trace.SpanKind, self.kind, otel_trace.SpanKind.INTERNAL))
+
+    def traceparent_header(self) -> Optional[str]:
+        """W3C traceparent identifying the root span, for the response; None when not sampled."""
+        if isinstance(self.span, Span):
+            return f"00-{self.span.trace_id}-{self.span.span_id}-01"
+        return None
+
+
+def _tracer_scope(name: str, attributes: dict, **kwargs):
+    return _otel_tracer.start_as_current_span(
+        name, attributes={k: v for k, v in attributes.items() if v is not None}, **kwargs)
+
+
+def start_trace(name: str, request_id: str = None, session_id: str = None, traceparent: str = None,
+                kind: str = "SERVER", **attributes) -> _RequestScope:
+    """
+    Root scope for one request (or job). `traceparent` continues a caller's
+    W3C trace context, including its sampling decision.
+    """
+    return _RequestScope(name, request_id, session_id, traceparent, kind, attributes)
+
+
+def span(name: str, **attributes):
+    """
+    Child span of the current one, as a context manager yielding the span.
+    No-op (yields NON_RECORDING_SPAN) outside a sampled trace.
+    """
+    if _otel_tracer is not None:
+        return _tracer_scope(name, {**(_correlation.get() or {}), **attributes})
+    parent = _current_span.get()
+    if parent is None:
+        return _NULL_SCOPE
+    return _SpanScope(Span(name, parent.trace_id, parent.span_id, {**(_correlation.get() or {}), **attributes}))
+
+
+def current_span():
+    """The innermost open span (NON_RECORDING_SPAN when not tracing)."""
+    if _otel_tracer is not None:
+        from opentelemetry import trace as otel_trace
+        return otel_trace.get_current_span()
+    current = _current_span.get()
+    return current if current is not None else NON_RECORDING_SPAN
+
+
+def traced(name: str, **attributes):
+    """Decorator running each call inside `span(name, **attributes)` (sync or async functions)."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _otel_tracer is None and _current_span.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _otel_tracer is None and _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
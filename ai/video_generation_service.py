@@ -5,18 +5,19 @@
 from typing import Optional, List, Dict
 import os
 import json
+import logging
 import traceback
+import importlib.util
 from datetime import datetime
 
-# Global flag for moviepy availability
-try:
-    from moviepy import TextClip, ColorClip, CompositeVideoClip, concatenate_videoclips
-    import numpy as np
-    MOVIEPY_AVAILABLE = True
-    print("✅ MoviePy successfully imported!")
-except ImportError as e:
-    MOVIEPY_AVAILABLE = False
-    print(f"⚠️  MoviePy not available: {e}")
+from ai.utils.metrics import VIDEO_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+# Global flag for moviepy availability.
+# MoviePy (plus imageio/ffmpeg probing) is slow to import, so we only check that it is
+# installed here; the clip classes are imported inside the render methods.
+MOVIEPY_AVAILABLE = importlib.util.find_spec("moviepy") is not None
 
 class VideoGenerationService:
     """
@@ -34,9 +35,9 @@ class VideoGenerationService:
         }
         
         if self.moviepy_available:
-            print("✅ Video service initialized with MoviePy - High Quality Mode")
+            logger.info("Video service initialized with MoviePy - high quality mode")
         else:
-            print("⚠️  Video generation running in limited mode")
+            logger.warning("MoviePy not installed - video generation limited to script files")
 
         # Enhanced budgeting content with more detailed tips
         self.budgeting_content = {
@@ -98,14 +99,12 @@ class VideoGenerationService:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"budgeting_video_{timestamp}.mp4"
         
-        print("🎬 Creating high-quality budgeting video...")
         
         # Get the dominant pattern to personalize content
         dominant_pattern = diagnosis_summary.disorder_insights.dominant_disorder
         user_name = getattr(diagnosis_summary, 'user_name', 'there')
         
-        print(f"📊 Creating video for pattern: {dominant_pattern}")
-        print(f"🎯 User: {user_name}")
+        logger.info("Creating budgeting video", extra={"pattern": dominant_pattern, "output_path": output_path})
         
         # Build enhanced video content
         video_script = self._build_enhanced_script(dominant_pattern, user_name, diagnosis_summary)
@@ -114,12 +113,12 @@ class VideoGenerationService:
             try:
                 return self._generate_high_quality_video(video_script, dominant_pattern, output_path)
             except Exception as e:
-                print(f"❌ High-quality video generation failed: {e}")
-                print("🔄 Falling back to standard quality...")
+                logger.warning("High-quality video generation failed, falling back to standard quality",
+                               extra={"error": str(e)})
                 try:
                     return self._generate_standard_video(video_script, dominant_pattern, output_path)
                 except Exception as e2:
-                    print(f"❌ Standard video failed: {e2}")
+                    logger.error("Standard video failed, writing a script file instead", extra={"error": str(e2)})
                     return self._create_video_script_file(video_script, output_path)
         else:
             return self._create_video_script_file(video_script, output_path)
@@ -189,19 +188,18 @@ class VideoGenerationService:
         script["total_duration"] = sum(section["duration"] for section in script["sections"])
         return script
 
+    @timed(VIDEO_SECONDS, mode="high_quality")
     def _generate_high_quality_video(self, script: Dict, pattern: str, output_path: str) -> str:
         """Generate high-quality video with enhanced visuals."""
         try:
-            print("🎥 Creating high-quality video...")
-            
-            from moviepy import concatenate_videoclips
+            from moviepy import TextClip, CompositeVideoClip, concatenate_videoclips
             
             scenes = []
             content = script["theme"]
             width, height = self.video_quality['resolution']
             
             for i, section in enumerate(script["sections"]):
-                print(f"🎞️ Creating scene {i+1}: {section['title']}")
+                logger.debug("Creating scene", extra={"scene": i + 1, "title": section["title"]})
                 
                 # Create animated background
                 background = self._create_animated_background(
@@ -249,11 +247,10 @@ class VideoGenerationService:
                 scenes.append(scene)
             
             # Concatenate scenes with crossfade
-            print(f"🎬 Combining {len(scenes)} scenes with transitions...")
             final_video = concatenate_videoclips(scenes, method="compose", padding=0.5)
             
             # Write high-quality video
-            print("💾 Rendering high-quality video...")
+            logger.info("Rendering high-quality video", extra={"scenes": len(scenes)})
             final_video.write_videofile(
                 output_path,
                 fps=self.video_quality['fps'],
@@ -268,21 +265,23 @@ class VideoGenerationService:
                 ]
             )
             
-            print(f"✅ High-quality video created: {output_path}")
-            print(f"📊 Video specs: {self.video_quality['resolution'][0]}p, {self.video_quality['fps']}fps")
+            logger.info("High-quality video created", extra={
+                "output_path": output_path,
+                "resolution": self.video_quality['resolution'][0],
+                "fps": self.video_quality['fps']
+            })
             
             return output_path
             
         except Exception as e:
-            print(f"❌ High-quality generation failed: {e}")
+            logger.error("High-quality generation failed", extra={"error": str(e)})
             raise
 
+    @timed(VIDEO_SECONDS, mode="standard")
     def _generate_standard_video(self, script: Dict, pattern: str, output_path: str) -> str:
         """Generate standard quality video as fallback."""
         try:
-            print("🎥 Creating standard quality video...")
-            
-            from moviepy import concatenate_videoclips
+            from moviepy import TextClip, ColorClip, CompositeVideoClip, concatenate_videoclips
             
             scenes = []
             content = script["theme"]
@@ -315,15 +314,17 @@ class VideoGenerationService:
             final_video = concatenate_videoclips(scenes)
             final_video.write_videofile(output_path, fps=24)
             
-            print(f"✅ Standard video created: {output_path}")
+            logger.info("Standard video created", extra={"output_path": output_path})
             return output_path
             
         except Exception as e:
-            print(f"❌ Standard video failed: {e}")
+            logger.error("Standard video failed", extra={"error": str(e)})
             raise
 
     def _create_animated_background(self, width: int, height: int, gradient: list, duration: float):
         """Create an animated gradient background."""
+        from moviepy import ColorClip
+
         try:
             # For now, use a solid color - animated backgrounds are complex
             return ColorClip(size=(width, height), color=gradient[0], duration=duration)
@@ -331,6 +332,7 @@ class VideoGenerationService:
             # Fallback to simple color
             return ColorClip(size=(width, height), color=gradient[0], duration=duration)
 
+    @timed(VIDEO_SECONDS, mode="script_file")
     def _create_video_script_file(self, script: Dict, output_path: str) -> str:
         """Create a detailed script file when video generation isn't available."""
         txt_path = output_path.replace('.mp4', '_script.txt')
@@ -368,7 +370,7 @@ class VideoGenerationService:
             f.write(f"\n[High-quality video would be generated as: {output_path}]\n")
             f.write(f"[Video specs: {self.video_quality['resolution'][0]}p, {self.video_quality['fps']}fps, {self.video_quality['bitrate']}]\n")
         
-        print(f"📹 Premium video script saved: {txt_path}")
+        logger.info("Video script saved", extra={"path": txt_path})
         return txt_path
 
 # Test function for high-quality video generation
@@ -406,4 +408,6 @@ def test_premium_video():
     print(f"🎯 Test result: {result}")
 
 if __name__ == "__main__":
+    from ai.utils.logging_config import configure_logging
+    configure_logging(fmt="text")
     test_premium_video()
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Throughput vs. tail latency of emotion micro-batching, against the local stub server.
+
+Each configuration runs `--clients` closed-loop callers of
+analyze_emotional_content for `--seconds`. The upstream stub serves at most
+`--upstream-concurrency` requests at once with `--latency-ms` each, roughly like a
+rate-limited Groq account. The unbatched row calls the service directly; the
+other rows go through EmotionBatcher with the given batch size / wait window.
+
+Usage:
+    python benchmarks/emotion_batching.py [--clients 32] [--seconds 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+os.environ.setdefault("AI_MODE", "groq")
+os.environ.setdefault("GROQ_API_KEY", "stub")
+
+from stub_groq_server import start_in_thread  # noqa: E402
+
+TEXTS = [
+    "I get anxious every time I open my banking app.",
+    "I finally paid off my credit card and feel hopeful.",
+    "Rent went up again and I'm stressed about next month.",
+    "I keep buying things online when I'm bored.",
+]
+
+# (label, max_batch, max_wait_ms); None means call the service directly
+CONFIGS = [
+    ("unbatched", None, None),
+    ("batch 4 / 2 ms", 4, 2),
+    ("batch 8 / 5 ms", 8, 5),
+    ("batch 16 / 10 ms", 16, 10),
+]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run(analyzer, clients: int, seconds: float):
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client(i):
+        n = i
+        while time.monotonic() < stop_at:
+            started = time.monotonic()
+            analyzer.analyze_emotional_content(TEXTS[n % len(TEXTS)])
+            with lock:
+                latencies.append(time.monotonic() - started)
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    began = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.monotonic() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--upstream-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    server, base_url = start_in_thread(latency_ms=args.latency_ms, per_token_ms=0.5,
+                                       concurrency=args.upstream_concurrency)
+
+    from openai import OpenAI
+    from ai.services.emotion_batcher import EmotionBatcher
+    from ai.services.groq_emotional_service import GroqEmotionalIntelligenceService
+    from ai.services.rate_limiter import RequestScheduler
+    from ai.services.resilience import ResilientChatClient
+
+    header = f"{'Configuration':<20}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'upstream calls':>16}{'avg batch':>11}"
+    print(header)
+    print("-" * len(header))
+    for label, max_batch, max_wait_ms in CONFIGS:
+        service = GroqEmotionalIntelligenceService()
+        # No client-side rate limit here: the stub's concurrency cap is the bottleneck
+        service._client = ResilientChatClient(
+            lambda: OpenAI(api_key="stub", base_url=base_url, max_retries=0),
+            deadline=30, scheduler=RequestScheduler(limits={}, default_limit=(10 ** 6, 10 ** 9))
+        )
+        analyzer = service if max_batch is None else EmotionBatcher(service, max_batch, max_wait_ms, max_in_flight=8)
+
+        calls_before = server.requests
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, elapsed = run(analyzer, args.clients, args.seconds)
+        upstream = server.requests - calls_before
+        batch = getattr(analyzer, "average_batch_size", 1.0)
+        print(f"{label:<20}{len(latencies) / elapsed:>10.1f}{statistics.median(latencies) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}{upstream:>16}{batch:>11.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Cold-start import benchmark for the CAPcoach entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+entry point and reports the median cumulative import time of the top-level module.
+
+Usage:
+    python benchmarks/import_time.py               # measure the working tree
+    python benchmarks/import_time.py --ref HEAD~1  # also measure an older revision
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# (label, module, working directory relative to the project root)
+ENTRY_POINTS = [
+    ("Flask backend (Backend/api.py)", "api", "Backend"),
+    ("Forecasting model (Backend/backend.py)", "backend", "Backend"),
+    ("CLI (ai/run.py)", "ai.run", "."),
+    ("Video service", "ai.video_generation_service", "."),
+]
+
+
+def measure(root: Path, module: str, cwd: str, runs: int) -> float:
+    """Return the median cumulative import time of `module` in milliseconds."""
+    env = dict(os.environ)
+    # A dummy key makes the Flask app construct its AI services, as it does in production
+    env.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env["PYTHONPATH"] = str(root)
+
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=root / cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        for line in reversed(result.stderr.splitlines()):
+            if not line.startswith("import time:"):
+                continue
+            _, _, cumulative, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+            if name == module:
+                samples.append(int(cumulative) / 1000)
+                break
+        else:
+            raise RuntimeError(f"Could not import {module}:\n{result.stderr[-2000:]}")
+    return statistics.median(samples)
+
+
+def checkout(ref: str, into: Path) -> Path:
+    """Extract `ref` into a temporary directory with `git archive`."""
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", ref],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        check=True,
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(into)
+    return into
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ref", help="git revision to compare against (e.g. HEAD~1)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per entry point")
+    args = parser.parse_args()
+
+    trees = [("working tree", PROJECT_ROOT)]
+    tmp = None
+    if args.ref:
+        tmp = tempfile.TemporaryDirectory()
+        trees.insert(0, (args.ref, checkout(args.ref, Path(tmp.name))))
+
+    try:
+        header = f"{'Entry point':<42}" + "".join(f"{label:>16}" for label, _ in trees)
+        print(header)
+        print("-" * len(header))
+        for label, module, cwd in ENTRY_POINTS:
+            row = f"{label:<42}"
+            timings = []
+            for _, root in trees:
+                try:
+                    timings.append(measure(root, module, cwd, args.runs))
+                    row += f"{timings[-1]:>13.1f} ms"
+                except RuntimeError:
+                    row += f"{'error':>16}"
+            if len(timings) == 2 and timings[1]:
+                row += f"   ({timings[0] / timings[1]:.1f}x faster)"
+            print(row)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: Flask's default JSON provider vs. the orjson provider.
+
+Times `app.json.response(payload)` (what `jsonify` does) on payloads shaped like the
+CAPcoach responses. The default provider can't encode NumPy or Pydantic values, so its
+timings include the manual conversion the routes would otherwise do.
+
+Usage:
+    python benchmarks/json_provider.py [--number 2000]
+"""
+
+import argparse
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "Backend"))
+
+from json_provider import ORJSONProvider  # noqa: E402
+
+
+def forecast_payload():
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(800, 300, 12)) + 25000
+    start = datetime(2025, 1, 1)
+    return {
+        "current_net_worth": np.float64(25000.0),
+        "predicted_net_worth_12mo": values[-1],
+        "monthly_forecast": [
+            {"date": (start + timedelta(days=30 * i)).strftime("%Y-%m-%d"), "net_worth": value}
+            for i, value in enumerate(values)
+        ],
+        "risk_history": rng.uniform(0, 100, 24).round(1),
+    }
+
+
+def transactions_payload():
+    from statement_store import default_store
+    return {"user_id": "MOCK_U001_IRRESPONSIBLE", "limit": 200,
+            **default_store().page("MOCK_U001_IRRESPONSIBLE", limit=200)}
+
+
+def emotions_payload():
+    emotions = ["anxiety", "fear", "shame", "guilt", "hope", "confidence", "frustration", "overwhelm"]
+    rng = np.random.default_rng(1)
+    return {"text": "I keep avoiding opening my credit card statement.",
+            "emotional_analysis": dict(zip(emotions, rng.uniform(0, 1, len(emotions)))),
+            "dominant_emotion": "anxiety"}
+
+
+def conversation_payload():
+    from ai.models.conversation import ConversationTurn
+    from ai.models.diagnosis import DiagnosisSummary, DisorderInsights
+
+    turns = [
+        ConversationTurn(speaker="user" if i % 2 == 0 else "ai",
+                         text=f"Message {i}: I usually spend more when work gets stressful.",
+                         emotions={"anxiety": 0.7, "shame": 0.3},
+                         patterns={"impulsivity": 0.6})
+        for i in range(40)
+    ]
+    summary = DiagnosisSummary(
+        session_id="bench-session",
+        disorder_insights=DisorderInsights(avoidance_score=0.4, impulsivity_score=0.7,
+                                           anxiety_score=0.6, money_dyslexia_score=0.1),
+        suggested_actions=["Set a weekly spending check-in", "Automate savings transfers"],
+        emotional_trends={"anxiety": 0.62, "hope": 0.31},
+    )
+    return {"session_id": "bench-session", "turns": turns, "summary": summary}
+
+
+def to_builtin(obj):
+    """The conversion routes need before handing values to the stdlib encoder."""
+    if isinstance(obj, dict):
+        return {key: to_builtin(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_builtin(value) for value in obj]
+    if hasattr(obj, "model_dump"):
+        return to_builtin(obj.model_dump(mode="json"))
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return obj
+
+
+PAYLOADS = [
+    ("forecast (12 months + risk history)", forecast_payload),
+    ("transactions page (200 rows)", transactions_payload),
+    ("emotion analysis", emotions_payload),
+    ("conversation (40 turns + summary)", conversation_payload),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is reported)")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default, fast = DefaultJSONProvider(app), ORJSONProvider(app)
+
+    header = f"{'Payload':<38}{'bytes':>8}{'default':>14}{'orjson':>14}{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+    with app.app_context():
+        for label, build in PAYLOADS:
+            payload = build()
+            size = len(fast.response(payload).get_data())
+
+            def run_default():
+                default.response(to_builtin(payload))
+
+            def run_fast():
+                fast.response(payload)
+
+            timings = []
+            for fn in (run_default, run_fast):
+                best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat))
+                timings.append(best / args.number * 1e6)
+            print(f"{label:<38}{size:>8}{timings[0]:>11.1f} us{timings[1]:>11.1f} us"
+                  f"{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
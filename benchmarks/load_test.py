@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the CAPcoach Flask API.
+
+Requests are fired at a fixed target rate (`--rps`), with Poisson or evenly spaced
+arrivals, spread over a weighted route mix:
+
+    session   POST /api/ai/session/start
+    chat      POST /api/ai/chat/send          (round-robin over pre-started sessions)
+    emotions  POST /api/ai/analyze-emotions
+    insights  GET  /api/ai/session/<id>/insights
+    risk      GET  /api/financial/risk-score
+    transactions GET /api/financial/transactions
+    savings   POST /api/financial/savings-target
+
+Latency is measured from each request's scheduled send time, so a backend that
+falls behind shows up in the percentiles instead of silently lowering the rate.
+Each route gets one untimed warm-up request first (skip with `--no-warmup`).
+
+Without `--target`, the script starts the stub Groq server (stub_groq_server.py,
+all stub options apply) and the Flask app on free ports, with GROQ_BASE_URL
+pointing at the stub. Use `--target` to hit a server you started yourself.
+
+Usage:
+    python benchmarks/load_test.py --rps 50 --seconds 20 --latency-dist lognormal --error-rate 0.02
+    python benchmarks/load_test.py --target http://127.0.0.1:5001 --mix chat=3,emotions=2
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_groq_server import add_stub_arguments, start_in_thread, stub_options  # noqa: E402
+
+MESSAGES = [
+    "I get anxious every time I open my banking app.",
+    "I spent too much on takeout again this week.",
+    "I want to build an emergency fund but I never stick to it.",
+    "Rent went up and I'm scared about next month.",
+]
+DEFAULT_MIX = "chat=4,emotions=3,insights=1,risk=1,transactions=1,savings=1"
+
+
+class Target:
+    """Thin JSON client for the Flask app."""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def call(self, method: str, path: str, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def build_routes(sessions):
+    """name -> function returning (method, path, body) for one request."""
+    counter = iter(range(10 ** 12))
+
+    def session_id():
+        return sessions[next(counter) % len(sessions)]
+
+    return {
+        "session": lambda: ("POST", "/api/ai/session/start", {"age": 30}),
+        "chat": lambda: ("POST", "/api/ai/chat/send",
+                         {"session_id": session_id(), "message": random.choice(MESSAGES)}),
+        "emotions": lambda: ("POST", "/api/ai/analyze-emotions", {"text": random.choice(MESSAGES)}),
+        "insights": lambda: ("GET", f"/api/ai/session/{session_id()}/insights", None),
+        "risk": lambda: ("GET", "/api/financial/risk-score", None),
+        "transactions": lambda: ("GET", "/api/financial/transactions?limit=50", None),
+        "savings": lambda: ("POST", "/api/financial/savings-target", {"target_growth_percent": [10, 20]}),
+    }
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+# ---------------------------------------------------------
+def run(target: Target, routes, mix, rps: float, seconds: float, workers: int, poisson: bool):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    results = {name: {"latencies": [], "statuses": {}} for name in names}
+    lock = threading.Lock()
+
+    def send(name, scheduled):
+        method, path, body = routes[name]()
+        try:
+            status, _ = target.call(method, path, body)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.monotonic() - scheduled
+        with lock:
+            results[name]["latencies"].append(elapsed)
+            results[name]["statuses"][status] = results[name]["statuses"].get(status, 0) + 1
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    began = time.monotonic()
+    next_at = began
+    while next_at < began + seconds:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(send, random.choices(names, weights)[0], next_at)
+        next_at += random.expovariate(rps) if poisson else 1.0 / rps
+    pool.shutdown(wait=True)
+    return results, time.monotonic() - began
+
+
+def report(results, elapsed: float):
+    header = f"{'Route':<14}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    summary = {}
+    everything = []
+    for name, r in results.items():
+        lat = r["latencies"]
+        if not lat:
+            continue
+        everything.extend(lat)
+        errors = sum(n for s, n in r["statuses"].items() if not (isinstance(s, int) and s < 400))
+        summary[name] = {
+            "requests": len(lat), "errors": errors, "rps": round(len(lat) / elapsed, 2),
+            "p50_ms": round(percentile(lat, 0.50) * 1000, 1), "p95_ms": round(percentile(lat, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(lat, 0.99) * 1000, 1), "max_ms": round(max(lat) * 1000, 1),
+            "statuses": {str(s): n for s, n in r["statuses"].items()},
+        }
+        row = summary[name]
+        print(f"{name:<14}{row['requests']:>9}{errors:>8}{row['rps']:>9.1f}{row['p50_ms']:>10.1f}"
+              f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    print("-" * len(header))
+    print(f"{'total':<14}{len(everything):>9}{'':>8}{len(everything) / elapsed:>9.1f}"
+          f"{percentile(everything, 0.50) * 1000:>10.1f}{percentile(everything, 0.95) * 1000:>10.1f}"
+          f"{percentile(everything, 0.99) * 1000:>10.1f}{max(everything, default=0) * 1000:>10.1f}")
+    return summary
+
+
+# ---------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_backend(stub_url: str, port: int, ai_mode: str, rate_limits: str):
+    """Run Backend/api.py's app on `port` (threaded, no reloader) against the stub."""
+    env = dict(os.environ, GROQ_BASE_URL=stub_url, GROQ_API_KEY="stub", AI_MODE=ai_mode,
+               GROQ_RATE_LIMITS=rate_limits)
+    code = f"import api; api.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=PROJECT_ROOT / "Backend", env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    target = Target(f"http://127.0.0.1:{port}", timeout=5)
+    for _ in range(300):
+        if proc.poll() is not None:
+            raise RuntimeError("Backend exited during startup")
+        try:
+            if target.call("GET", "/api/health")[0] == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("Backend did not come up within 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="base URL of a running backend (default: spawn one against the stub)")
+    parser.add_argument("--rps", type=float, default=20.0, help="target request rate")
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight,... (routes: see above)")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--sessions", type=int, default=16, help="sessions started before the run")
+    parser.add_argument("--workers", type=int, default=128, help="client threads")
+    parser.add_argument("--no-warmup", action="store_true", help="include cold-start requests in the results")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request client timeout")
+    parser.add_argument("--ai-mode", default="groq", help="AI_MODE for the spawned backend")
+    parser.add_argument("--rate-limits", default="*=100000:1000000000",
+                        help="GROQ_RATE_LIMITS for the spawned backend (default: effectively unlimited, "
+                             "so the stub is the bottleneck)")
+    parser.add_argument("--json", type=Path, help="also write the per-route summary here")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stub = backend = None
+    try:
+        if args.target:
+            target = Target(args.target, args.timeout)
+        else:
+            stub, stub_url = start_in_thread(**stub_options(args))
+            port = free_port()
+            backend = spawn_backend(stub_url, port, args.ai_mode, args.rate_limits)
+            target = Target(f"http://127.0.0.1:{port}", args.timeout)
+            print(f"Backend on :{port}, stub Groq on {stub_url} "
+                  f"({args.latency_dist} {args.latency_ms:g} ms, error rate {args.error_rate:g})")
+
+        mix = parse_mix(args.mix)
+        sessions = []
+        for _ in range(args.sessions if {"chat", "insights"} & set(mix) else 0):
+            status, body = target.call("POST", "/api/ai/session/start", {"age": 30})
+            if status == 200:
+                sessions.append(json.loads(body)["session_id"])
+        if not sessions:
+            mix = {k: v for k, v in mix.items() if k not in ("chat", "insights")}
+            if args.sessions:
+                print("⚠️ No AI sessions could be started; skipping chat and insights")
+        routes = build_routes(sessions)
+        unknown = set(mix) - set(routes)
+        if unknown:
+            parser.error(f"unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+        if not args.no_warmup:
+            # One request per route first, so cold caches (forecast fits, lexicons) stay out of the percentiles
+            for name in mix:
+                target.call(*routes[name]())
+
+        print(f"Sending {args.rps:g} req/s ({args.arrivals}) for {args.seconds:g}s over {', '.join(mix)}\n")
+        results, elapsed = run(target, routes, mix, args.rps, args.seconds, args.workers,
+                               args.arrivals == "poisson")
+        summary = report(results, elapsed)
+        if stub is not None:
+            print(f"\nStub: {stub.requests} upstream calls, {stub.errors} injected errors")
+        if args.json:
+            args.json.write_text(json.dumps({"rps": args.rps, "seconds": elapsed, "routes": summary}, indent=2))
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait()
+        if stub is not None:
+            stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for the Groq API, for benchmarks and load tests.
+
+Serves `POST .../chat/completions` (plain and `stream: true` server-sent events)
+and `GET .../models`, with canned replies shaped for the CAPcoach prompts
+(emotion JSON, batched emotion JSON, summaries or chat text). It simulates:
+
+- time to first token drawn from a latency distribution (fixed, normal,
+  lognormal or exponential) with `--latency-ms` as the median
+- generation at `--tokens-per-second` (0 = instant), streamed word by word
+- injected failures at `--error-rate`, drawn from `--error-codes`
+  (429 replies carry a Retry-After header)
+- a concurrency cap, like a rate-limited upstream
+
+Usage:
+    python benchmarks/stub_groq_server.py --port 8800 --latency-dist lognormal --error-rate 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8800/v1 GROQ_API_KEY=stub python Backend/api.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMOTION_SCORES = {"anxious": 0.7, "stressed": 0.5, "hopeful": 0.2}
+CHAT_REPLY = ("That sounds really stressful, and it makes sense that you'd want to look away. "
+              "What usually happens right before you avoid checking your account?")
+SUMMARY_REPLY = "The user feels anxious about money, avoids checking balances and wants an emergency fund."
+LATENCY_DISTRIBUTIONS = ("fixed", "normal", "lognormal", "exponential")
+MODELS = ("llama-3.1-8b-instant", "llama-3.3-70b-versatile")
+
+
+def reply_for(messages) -> str:
+    """A plausible reply for the CAPcoach prompt in `messages`."""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = messages[-1]["content"] if messages else ""
+    if '"results"' in system:
+        try:
+            ids = [text["id"] for text in json.loads(user)["texts"]]
+        except (ValueError, KeyError, TypeError):
+            ids = [0]
+        return json.dumps({"results": [{"id": i, "emotions": EMOTION_SCORES} for i in ids]})
+    if "JSON object" in system:
+        return json.dumps(EMOTION_SCORES)
+    if "summary" in system.lower() or "summary" in user[:200].lower():
+        return SUMMARY_REPLY
+    return CHAT_REPLY
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once; the default backlog of 5 causes SYN retries
+    request_queue_size = 1024
+
+    def __init__(self, address, latency_ms: float = 80.0, per_token_ms: float = 0.0, concurrency: int = 0,
+                 latency_dist: str = "fixed", latency_sigma: float = 0.5, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, error_codes=(429, 500, 503), seed: int = None):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        super().__init__(address, StubHandler)
+        self.latency = latency_ms / 1000.0
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.per_token = per_token_ms / 1000.0
+        if tokens_per_second:
+            self.per_token += 1.0 / tokens_per_second
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.requests = 0
+        self.errors = 0
+        self._count_lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or lose a hedge race hang up mid-reply; that is expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def first_token_delay(self) -> float:
+        """Seconds before the first token, drawn from the configured distribution."""
+        with self._count_lock:
+            r = self._random
+            if self.latency_dist == "normal":
+                return max(r.gauss(self.latency, self.latency * self.latency_sigma), 0.0)
+            if self.latency_dist == "lognormal":
+                # Median stays at `latency`; sigma controls how heavy the tail is
+                return self.latency * r.lognormvariate(0.0, self.latency_sigma)
+            if self.latency_dist == "exponential":
+                return r.expovariate(1.0 / self.latency) if self.latency else 0.0
+            return self.latency
+
+    def injected_error(self):
+        """An HTTP status to fail this request with, or None."""
+        with self._count_lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return self._random.choice(self.error_codes)
+        return None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers=()):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self.path.rstrip("/").endswith("/models"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        self._send_json(200, {"object": "list",
+                              "data": [{"id": m, "object": "model", "owned_by": "stub"} for m in MODELS]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        server = self.server
+        with server._count_lock:
+            server.requests += 1
+            request_id = server.requests
+
+        messages = body.get("messages", [])
+        content = reply_for(messages)
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+
+        if server.slots:
+            server.slots.acquire()
+        try:
+            time.sleep(server.first_token_delay())
+            status = server.injected_error()
+            if status is not None:
+                headers = [("Retry-After", "0.2")] if status == 429 else []
+                self._send_json(status, {"error": {"message": f"Injected stub error ({status})",
+                                                   "type": "stub_error", "code": status}}, headers)
+            elif body.get("stream"):
+                self._stream(request_id, body, content, usage)
+            else:
+                time.sleep(server.per_token * completion_tokens)
+                self._send_json(200, {
+                    "id": f"chatcmpl-stub-{request_id}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+        finally:
+            if server.slots:
+                server.slots.release()
+
+    # ---------------------------------------------------------
+    def _stream(self, request_id: int, body: dict, content: str, usage: dict):
+        """chat.completion.chunk events, one per word, paced at the token rate."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        base = {"id": f"chatcmpl-stub-{request_id}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "stub")}
+
+        def delta(payload, finish_reason=None):
+            self._write_event({**base, "choices": [{"index": 0, "delta": payload, "finish_reason": finish_reason}]})
+
+        delta({"role": "assistant", "content": ""})
+        for i, word in enumerate(content.split(" ")):
+            piece = word if i == 0 else " " + word
+            time.sleep(self.server.per_token * estimate_tokens(piece))
+            delta({"content": piece})
+        delta({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._write_event({**base, "choices": [], "usage": usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_event(self, payload: dict):
+        self._write_chunk(b"data: " + json.dumps(payload).encode() + b"\n\n")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def start_in_thread(port: int = 0, **options):
+    """Start a StubServer on a background thread; returns (server, base_url)."""
+    server = StubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def add_stub_arguments(parser):
+    """Stub options, shared with load_test.py."""
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="median time to first token")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="spread of the normal/lognormal distributions")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="generation speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--error-codes", type=lambda s: [int(c) for c in s.split(",")], default=[429, 500, 503],
+                        help="comma-separated statuses for injected failures")
+    parser.add_argument("--concurrency", type=int, default=0, help="requests served at once (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_options(args) -> dict:
+    return {"latency_ms": args.latency_ms, "latency_dist": args.latency_dist,
+            "latency_sigma": args.latency_sigma, "tokens_per_second": args.tokens_per_second,
+            "error_rate": args.error_rate, "error_codes": args.error_codes,
+            "concurrency": args.concurrency, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8800)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), **stub_options(args))
+    print(f"Stub Groq API on http://127.0.0.1:{args.port}/v1 "
+          f"({args.latency_dist} {args.latency_ms:g} ms, error rate {args.error_rate:g})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the CAPcoach hot paths, with baseline regression checks.
+
+Each benchmark is timed in-process (timeit-style: the call count per sample is
+auto-ranged unless fixed, several samples are taken and the median per-call time
+is kept). Results are written as JSON; when a baseline file exists, each median
+is compared against it and the run fails (exit 1) if any path got slower than
+`--threshold` (default 25%).
+
+Covered paths:
+    emotions.*      EmotionalIntelligenceService.analyze_emotional_content
+    patterns.*      PatternDetectionService.detect_patterns
+    add_turn[n]     ConversationContext.add_turn on a session already holding n turns
+    user_df_gen     Backend/backend.py history parsing + DataFrame build
+    calc_risk       Backend/backend.py risk score
+    forecast        Backend/backend.py auto-ARIMA net-worth forecast (slow; skipped by --quick)
+    video_script.*  VideoGenerationService._build_enhanced_script
+
+Usage:
+    python benchmarks/suite.py --save-baseline      # record benchmarks/results/baseline.json
+    python benchmarks/suite.py                      # run and compare against it
+    python benchmarks/suite.py --quick -k add_turn  # subset, skipping slow benchmarks
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "Backend"))
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+SHORT_TEXT = "I'm worried I'll buy something on impulse again."
+LONG_TEXT = " ".join([
+    "Every month I tell myself I'll check my account, but I keep putting it off.",
+    "When I finally look I get nervous and upset, then I spend to feel better.",
+    "I mix up due dates and forget which card I used, so I just avoid it all.",
+] * 8)
+
+
+class Benchmark:
+    """
+    `make(param)` does the setup and returns the zero-argument callable to time.
+    With `fresh_state`, make() runs again before every sample (for calls that
+    mutate what they work on) and the callable runs exactly `number` times.
+    """
+
+    def __init__(self, name, make, params=(None,), number=None, repeat=7, fresh_state=False, slow=False):
+        self.name = name
+        self.make = make
+        self.params = params
+        self.number = number
+        self.repeat = repeat
+        self.fresh_state = fresh_state
+        self.slow = slow
+
+    def cases(self):
+        for param in self.params:
+            yield (self.name if param is None else f"{self.name}[{param}]"), param
+
+    def run(self, param) -> list:
+        """Per-call times in seconds, one per sample."""
+        if self.fresh_state:
+            samples = []
+            for _ in range(self.repeat):
+                fn = self.make(param)
+                started = time.perf_counter()
+                for _ in range(self.number):
+                    fn()
+                samples.append((time.perf_counter() - started) / self.number)
+            return samples
+        timer = timeit.Timer(self.make(param))
+        number = self.number or timer.autorange()[0]
+        return [t / number for t in timer.repeat(repeat=self.repeat, number=number)]
+
+
+BENCHMARKS = []
+
+
+def benchmark(name, **options):
+    def register(make):
+        BENCHMARKS.append(Benchmark(name, make, **options))
+        return make
+    return register
+
+
+# ---------------------------------------------------------
+@benchmark("emotions.analyze_emotional_content", params=("short", "long"))
+def bench_emotions(size):
+    from ai.services.emotional_intelligence_service import EmotionalIntelligenceService
+    service = EmotionalIntelligenceService()
+    text = SHORT_TEXT if size == "short" else LONG_TEXT
+    return lambda: service.analyze_emotional_content(text)
+
+
+@benchmark("patterns.detect_patterns", params=("short", "long"))
+def bench_patterns(size):
+    from ai.services.pattern_detection_service import PatternDetectionService
+    service = PatternDetectionService()
+    text = SHORT_TEXT if size == "short" else LONG_TEXT
+    return lambda: service.detect_patterns(text)
+
+
+def _turn(i):
+    from ai.models.conversation import ConversationTurn
+    return ConversationTurn(
+        speaker="user" if i % 2 == 0 else "ai",
+        text=f"Message {i}: {SHORT_TEXT}",
+        emotions={"anxious": 0.6, "sad": 0.2},
+        patterns={"avoidance": 0.5, "impulsivity": 0.3},
+    )
+
+
+@benchmark("add_turn", params=(10, 100, 1000), number=10, repeat=9, fresh_state=True)
+def bench_add_turn(n):
+    from ai.models.conversation import ConversationContext
+    context = ConversationContext(session_id="bench")
+    for i in range(n):
+        context.add_turn(_turn(i))
+    turns = iter([_turn(n + i) for i in range(10)])
+    return lambda: context.add_turn(next(turns))
+
+
+def _history_file():
+    from backend import DEFAULT_HISTORY_FILE
+    return DEFAULT_HISTORY_FILE
+
+
+@benchmark("user_df_gen")
+def bench_user_df_gen(_):
+    from backend import user_df_gen
+    path = _history_file()
+    return lambda: user_df_gen(path)
+
+
+@benchmark("calc_risk")
+def bench_calc_risk(_):
+    from backend import calc_risk, user_df_gen
+    df = user_df_gen(_history_file())
+    return lambda: calc_risk(df)
+
+
+@benchmark("forecast", number=1, repeat=3, slow=True)
+def bench_forecast(_):
+    from backend import forecast_net_worth, user_df_gen
+    df = user_df_gen(_history_file())
+    # forecast_net_worth re-indexes its input, so each call gets a copy
+    return lambda: forecast_net_worth(df.copy())
+
+
+@benchmark("video_script", params=("avoidance", "money_dyslexia"))
+def bench_video_script(pattern):
+    from ai.video_generation_service import VideoGenerationService
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = VideoGenerationService()
+    return lambda: service._build_enhanced_script(pattern, "Alex", None)
+
+
+# ---------------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(keyword=None, quick=False):
+    results = {}
+    for bench in BENCHMARKS:
+        if quick and bench.slow:
+            continue
+        for name, param in bench.cases():
+            if keyword and keyword not in name:
+                continue
+            # Services print banners on construction; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples = bench.run(param)
+            results[name] = {
+                "median_s": statistics.median(samples),
+                "min_s": min(samples),
+                "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+                "samples": len(samples),
+            }
+            print(f"  {name:<44}{format_time(results[name]['median_s']):>12}")
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(results, baseline, threshold: float):
+    """Print a comparison table; return the names that regressed beyond `threshold`."""
+    regressions = []
+    header = f"{'Benchmark':<44}{'baseline':>12}{'current':>12}{'change':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<44}{'—':>12}{format_time(current['median_s']):>12}{'new':>10}")
+            continue
+        ratio = current["median_s"] / before["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = "  faster"
+        print(f"{name:<44}{format_time(before['median_s']):>12}{format_time(current['median_s']):>12}"
+              f"{(ratio - 1) * 100:>+9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="keyword", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="skip slow benchmarks (forecasting)")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown of the median before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    print(f"Running {len(BENCHMARKS)} benchmark groups...")
+    results = run_suite(args.keyword, args.quick)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    print(f"\nCompared with baseline from commit {baseline.get('commit')} ({baseline.get('timestamp')}):\n")
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())